@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import random
+import argparse
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import consolidation
+from consolidation import COLUMNS, ENTRY_COLUMN
+
+# Approximate row counts of a current run
+MEASURE_ROWS = 600
+ORDER_ROWS = 400
+SANCTION_ROWS = 15
+COUNTRY_ROWS = 200
+
+# Consolidation written the way the notebook did it, with per-group Python lambdas, kept for timing.
+# It is a rewrite, not the notebook itself: tests/test_consolidation.py checks the module against
+# the output of the notebook's own cells.
+def reference_consolidate(measures_df, orders_df, sanctions_df, countries_df):
+    measures = measures_df.dropna(subset=['Restrictive Measures'])
+    # The measures of a sanctions map row are bulleted together, then a country's rows are joined with a newline
+    rows = measures.groupby(['Country', ENTRY_COLUMN], sort=False)['Restrictive Measures'].agg(
+        lambda x: ''.join(f"\n● {measure}" for measure in x)).reset_index()
+    main_res_df = rows.groupby('Country', sort=False)['Restrictive Measures'].agg(
+        lambda x: '\n'.join(x)).reset_index().reindex(columns=COLUMNS)
+
+    df = orders_df.dropna(subset=['Executive Orders']).copy()
+    df['Executive Orders'] = '\n•' + df['Executive Orders'].astype(str)
+    df = df.reindex(columns=COLUMNS)
+
+    merged_df = pd.concat([main_res_df, df, sanctions_df.reindex(columns=COLUMNS)], ignore_index=True)
+    new = pd.merge(merged_df, countries_df[['Country']].drop_duplicates(), on='Country', how='inner')
+    return new.groupby('Country')[COLUMNS[1:]].agg(
+        lambda x: ' '.join(str(val) for val in x if pd.notna(val))).reset_index()
+
+# Function to build source frames scale times the size of a current run
+def synthetic_frames(scale, seed=0):
+    rng = random.Random(seed)
+    countries = [f'Country {i:04d}' for i in range(COUNTRY_ROWS * scale)]
+    # A few names that did not resolve to a country, as in the real sources
+    unknown = [f'Region {i}' for i in range(10)]
+
+    def country():
+        return rng.choice(countries) if rng.random() < 0.95 else rng.choice(unknown)
+
+    measure_countries = [country() for _ in range(MEASURE_ROWS * scale)]
+    measures_df = pd.DataFrame({
+        'Country': measure_countries,
+        'Restrictive Measures': [f'Measure {i} asset freeze and travel ban' for i in range(MEASURE_ROWS * scale)],
+        # Some countries are listed under a second sanctions regime
+        ENTRY_COLUMN: [name if rng.random() < 0.8 else f'{name} (2)' for name in measure_countries],
+    })
+    orders_df = pd.DataFrame({
+        'Country': [country() for _ in range(ORDER_ROWS * scale)],
+        'Executive Orders': [f'Executive Order {13000 + i} https://ofac.treasury.gov/media/{i}/download?inline'
+                             for i in range(ORDER_ROWS * scale)],
+    })
+    sanctions_df = pd.DataFrame({
+        'Country': [country() for _ in range(SANCTION_ROWS * scale)],
+        'Type of Sanctions': [' '.join(['Arms embargo. Asset freeze. Travel ban.'] * 20) for _ in range(SANCTION_ROWS * scale)],
+    })
+    countries_df = pd.DataFrame({'Country': countries})
+    return measures_df, orders_df, sanctions_df, countries_df
+
+# Main execution function
+def main():
+    parser = argparse.ArgumentParser(description='Compare the notebook consolidation with the vectorized one.')
+    parser.add_argument('--scales', type=int, nargs='+', default=[10, 30, 100])
+    args = parser.parse_args()
+
+    for scale in args.scales:
+        frames = synthetic_frames(scale)
+        rows = sum(len(frame) for frame in frames[:3])
+
+        started = time.perf_counter()
+        expected = reference_consolidate(*frames)
+        reference_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        final = consolidation.consolidate(*frames)
+        vectorized_time = time.perf_counter() - started
+
+        print(f"scale={scale:<4} rows={rows:<7} countries={len(final):<6} notebook={reference_time:.3f}s "
+              f"vectorized={vectorized_time:.3f}s speedup={reference_time / vectorized_time:.1f}x "
+              f"same_as_rewrite={final.equals(expected)}")
+
+# Execute the main function
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+import db_writer
+
+# Function to build a consolidated-style frame with short country names, medium text and a few long cells
+def synthetic_frame(rows, seed=0):
+    rng = random.Random(seed)
+    words = 'asset freeze travel ban arms embargo export import prohibition designated persons entities'.split()
+
+    def sentence(length):
+        return ' '.join(rng.choice(words) for _ in range(length))
+
+    return pd.DataFrame({
+        'Country': [f'Country {i % 200}' for i in range(rows)],
+        'Restrictive Measures': [sentence(rng.randint(5, 40)) for _ in range(rows)],
+        'Executive Orders': [f'Executive Order {13000 + i} https://ofac.treasury.gov/media/{i}/download?inline' for i in range(rows)],
+        'Type of Sanctions': [sentence(900) if i % 50 == 0 else sentence(rng.randint(5, 60)) for i in range(rows)],
+    })
+
+# Function to time one load and report rows per second
+def timed(label, rows, load):
+    started = time.perf_counter()
+    load()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} rows={rows:<7} time={elapsed:.3f}s rows/s={rows / elapsed:,.0f}")
+
+# Main execution function
+def main():
+    parser = argparse.ArgumentParser(description='Compare to_sql with the bulk and incremental loaders.')
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=db_writer.BATCH_SIZE)
+    parser.add_argument('--url', help='SQLAlchemy URL of the database to load, defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(args.url or f"sqlite:///{os.path.join(directory, 'bench.db')}")
+
+        timed('to_sql replace', args.rows, lambda: df.to_sql('bench_to_sql', engine, index=False, if_exists='replace'))
+        timed('bulk_load', args.rows, lambda: db_writer.bulk_load(df, 'bench_bulk', engine, args.batch_size))
+        timed('upsert_frame first load', args.rows,
+              lambda: db_writer.upsert_frame(df, 'bench_upsert', ['Country', 'Executive Orders'], engine, args.batch_size))
+
+        # A typical nightly run: a handful of rows changed
+        changed = df.copy()
+        changed.loc[changed.index % 100 == 0, 'Restrictive Measures'] += ' amended'
+        timed('upsert_frame 1% changed', args.rows,
+              lambda: db_writer.upsert_frame(changed, 'bench_upsert', ['Country', 'Executive Orders'], engine, args.batch_size))
+
+        print('column types:', {name: str(column_type) for name, column_type in db_writer.column_types(df).items()})
+        engine.dispose()
+
+# Execute the main function
+if __name__ == "__main__":
+    main()
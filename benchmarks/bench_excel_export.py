@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import excel_export
+
+# Function to build a consolidated-style frame: bulleted multi-line measures, executive orders with
+# OFAC links and long type-of-sanctions text, cell_scale times the usual size
+def synthetic_final(rows, cell_scale, seed=0):
+    rng = random.Random(seed)
+    words = 'asset freeze travel ban arms embargo export import prohibition designated persons entities'.split()
+
+    def sentence(length):
+        return ' '.join(rng.choice(words) for _ in range(length))
+
+    def orders(i):
+        count = rng.randint(1, 4) * cell_scale
+        return ' '.join(f'\n•Executive Order {13000 + i + n} https://ofac.treasury.gov/media/{i * 10 + n}/download?inline'
+                        for n in range(count))
+
+    return pd.DataFrame({
+        'Country': [f'Country {i}' for i in range(rows)],
+        'Restrictive Measures': [''.join(f'\n● {sentence(12)}' for _ in range(rng.randint(1, 5) * cell_scale))
+                                 for _ in range(rows)],
+        'Executive Orders': [orders(i) for i in range(rows)],
+        'Type of Sanctions': [sentence(rng.randint(40, 200) * cell_scale) for _ in range(rows)],
+    })
+
+# Function to time one export and measure its peak traced memory
+def measure(label, rows, export):
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        export()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    print(f"{label:<22} rows={rows:<7} time={elapsed:.3f}s rows/s={rows / elapsed:,.0f} peak={peak / 1024 / 1024:.1f}MB")
+
+# Main execution function
+def main():
+    parser = argparse.ArgumentParser(description='Compare DataFrame.to_excel with the streaming exporter.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 5000, 20000], help='row counts to export')
+    parser.add_argument('--cell-scale', type=int, default=1, help='multiplier of the text and links per cell')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            df = synthetic_final(rows, args.cell_scale)
+            measure('to_excel', rows, lambda: df.to_excel(os.path.join(directory, 'to_excel.xlsx'), index=False))
+            measure('streaming export', rows,
+                    lambda: excel_export.export_frame(df, os.path.join(directory, 'streaming.xlsx')))
+            print(f"{'file size':<22} to_excel={os.path.getsize(os.path.join(directory, 'to_excel.xlsx')):,} "
+                  f"streaming={os.path.getsize(os.path.join(directory, 'streaming.xlsx')):,} bytes")
+
+# Execute the main function
+if __name__ == "__main__":
+    main()
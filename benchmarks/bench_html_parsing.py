@@ -0,0 +1,105 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import importlib.util
+import tracemalloc
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay_server import FIXTURES_DIR
+import html_parsing
+
+# Program page parsing as it was done before html_parsing: a full html.parser tree scanned twice
+# with string predicates, kept for comparison
+def legacy_parse(html, parser='html.parser'):
+    soup = BeautifulSoup(html, parser)
+
+    brochure = None
+    heading = soup.find('h3', string=lambda text: text and 'Sanctions Brochures' in text)
+    if heading:
+        ul_tag = heading.find_next('ul')
+        if ul_tag:
+            a_tag = ul_tag.find('a')
+            if a_tag:
+                brochure = a_tag.get('href')
+
+    orders = []
+    heading1 = soup.find('h4', string=lambda text: text and 'Executive Orders' in text)
+    if heading1:
+        ul_tag = heading1.find_next('ul')
+        if ul_tag:
+            for li_tag in ul_tag.find_all('li'):
+                a_tag = li_tag.find('a')
+                if a_tag:
+                    orders.append((li_tag.text.strip(), a_tag.get('href')))
+
+    return brochure, orders
+
+# Function to load the recorded program pages (not the index page), keyed by program
+def load_program_pages(padding):
+    pages = {}
+    root = os.path.join(FIXTURES_DIR, 'ofac.treasury.gov', 'sanctions-programs-and-country-information')
+    for path in sorted(glob.glob(os.path.join(root, '*', 'index.html'))):
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        # Pad every page with navigation and footer markup to approach the size of the live pages
+        nav = ''.join(f'<li><a href="/menu/{i}">Menu item {i}</a><ul><li><a href="/menu/{i}/sub">Sub item</a></li></ul></li>'
+                      for i in range(padding))
+        footer = ''.join(f'<div class="footer"><p>Footer paragraph {i}</p><script>var x{i} = {i};</script></div>'
+                         for i in range(padding))
+        html = html.replace('<header>', f'<header><ul class="menu">{nav}</ul>', 1).replace('</body>', f'{footer}</body>', 1)
+        pages[os.path.basename(os.path.dirname(path))] = html
+    return pages
+
+# Function to parse every page once, returning the seconds per page and the largest peak of traced memory of a page
+def measure(parse, pages, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for html in pages.values():
+            parse(html)
+    seconds = (time.perf_counter() - started) / (iterations * len(pages))
+
+    peak = 0
+    for html in pages.values():
+        tracemalloc.start()
+        try:
+            parse(html)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return seconds, peak
+
+# Main execution function
+def main():
+    parser = argparse.ArgumentParser(description='Compare full-tree and strained single-pass parsing of OFAC program pages.')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--padding', type=int, default=200, help='navigation and footer blocks added to every page')
+    args = parser.parse_args()
+
+    pages = load_program_pages(args.padding)
+    average_kb = sum(len(html) for html in pages.values()) / len(pages) / 1024
+    print(f"{len(pages)} program pages, {average_kb:.1f}KB on average")
+
+    backends = [('legacy html.parser', legacy_parse),
+                ('strained html.parser', lambda html: html_parsing.parse_program_page(html, 'html.parser'))]
+    if importlib.util.find_spec('lxml'):
+        backends += [('legacy lxml', lambda html: legacy_parse(html, 'lxml')),
+                     ('strained lxml', lambda html: html_parsing.parse_program_page(html, 'lxml'))]
+
+    # Every backend has to find the same links as the legacy parser
+    expected = {name: legacy_parse(html) for name, html in pages.items()}
+    for label, parse in backends:
+        mismatches = [name for name, html in pages.items() if parse(html) != expected[name]]
+        if mismatches:
+            print(f"{label}: different links on {', '.join(mismatches)}")
+
+    for label, parse in backends:
+        seconds, peak = measure(parse, pages, args.iterations)
+        print(f"{label:<21} time={seconds * 1000:.2f}ms/page peak={peak / 1024:.0f}KB/page")
+
+# Execute the main function
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay_server import start_server
+
+# Function to read the program links from the recorded OFAC index page
+def load_programs(base_url, repeat):
+    index_path = os.path.join('ofac.treasury.gov', 'sanctions-programs-and-country-information', 'index.html')
+    with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures', index_path)) as f:
+        soup = BeautifulSoup(f.read(), 'html.parser')
+
+    links = soup.select('table.cols-2 tbody tr td:nth-of-type(1) a')
+    programs = [(a.get_text(strip=True), urljoin(base_url, a['href'])) for a in links]
+
+    # Repeat the corpus with distinct URLs so larger crawls can be simulated
+    return [(name, f"{url}?copy={i}") for i in range(repeat) for name, url in programs]
+
+# Main execution function
+def main():
+    parser = argparse.ArgumentParser(description='Compare serial and concurrent OFAC program page fetching.')
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds of latency injected per response')
+    parser.add_argument('--repeat', type=int, default=4, help='number of copies of the recorded program pages')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--per-host', type=int, default=8)
+    args = parser.parse_args()
+
+    server, base_url = start_server('ofac.treasury.gov', latency=args.latency)
+    os.environ['OFAC_BASE_URL'] = base_url
+    os.environ['MAX_PER_HOST'] = str(args.per_host)
+    os.environ['HTTP_CACHE_MODE'] = 'off'
+    os.environ['CRAWL_FRONTIER_PATH'] = os.path.join(tempfile.mkdtemp(), 'crawl_frontier.sqlite')
+
+    import data_extraction_column_3 as column_3
+    import logging
+    logging.getLogger().setLevel(logging.WARNING)
+
+    programs = load_programs(base_url, args.repeat)
+    try:
+        results = {}
+        for label, workers in (('serial', 1), ('concurrent', args.workers)):
+            start = time.perf_counter()
+            df = column_3.scrape_programs(programs, max_workers=workers)
+            elapsed = time.perf_counter() - start
+            results[label] = (df, elapsed)
+            print(f"{label:<11} workers={workers:<3} pages={len(programs):<4} rows={len(df):<5} "
+                  f"time={elapsed:.2f}s pages/s={len(programs) / elapsed:.1f}")
+
+        serial_df, serial_time = results['serial']
+        concurrent_df, concurrent_time = results['concurrent']
+        print(f"speedup={serial_time / concurrent_time:.1f}x identical_rows={serial_df.equals(concurrent_df)}")
+    finally:
+        server.shutdown()
+
+# Execute the main function
+if __name__ == "__main__":
+    main()
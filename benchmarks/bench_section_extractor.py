@@ -0,0 +1,92 @@
+import os
+import sys
+import glob
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import re
+from replay_server import FIXTURES_DIR
+from section_extractor import SectionExtractor, marker_pattern
+
+start_keyword = 'Types of Sanctions'
+end_keywords = ['Number of Listed Individuals', 'Exemptions']
+
+# Per-page extraction as it was done before the section extractor, kept for comparison
+def legacy_extract(text, start_keyword, end_keywords):
+    start_index = text.find(start_keyword)
+    if start_index != -1:
+        end_indices = [text.find(keyword, start_index) for keyword in end_keywords if keyword != -1]
+        min_end_index = min(end_index for end_index in end_indices if end_index != -1)
+        if min_end_index != -1:
+            return text[start_index + len(start_keyword):min_end_index]
+        else:
+            return text[start_index:]
+    return None
+
+# Function to run the legacy extractor over every page of a document
+def legacy_scan(pages):
+    found = []
+    for text in pages:
+        try:
+            specific_info = legacy_extract(text, start_keyword, end_keywords)
+        except ValueError:
+            # min() of an empty sequence when no end keyword is on the page
+            specific_info = None
+        if specific_info:
+            found.append(specific_info)
+    return found
+
+# Function to load the extracted fact-sheet text, one list of pages per document
+def load_corpus(padding):
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'www.securitycouncilreport.org', 'fact-sheet-text', '*.txt'))):
+        with open(path) as f:
+            pages = f.read().split('\f')
+        # Pad every page with filler text to simulate longer fact sheets
+        filler = ('Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * padding).strip()
+        corpus[os.path.basename(path)] = [f"{filler}\n{page}\n{filler}" if padding else page for page in pages]
+    return corpus
+
+# Main execution function
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark of fact-sheet section extraction.')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--padding', type=int, default=20, help='filler sentences added around every page')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.padding)
+    extractor = SectionExtractor(start_keyword, end_keywords)
+
+    # The same extractor searching one alternation of the end markers instead of one pattern per marker
+    alternation = re.compile('|'.join(marker_pattern(keyword) for keyword in end_keywords))
+    alternation_extractor = SectionExtractor(start_keyword, end_keywords)
+    alternation_extractor.search_end = lambda text, pos=0: alternation.search(text, pos)
+
+    found = legacy_found = 0
+    for name, pages in corpus.items():
+        section = extractor.scan_pages(iter(pages))
+        legacy = legacy_scan(pages)
+        found += section is not None
+        legacy_found += bool(legacy)
+        pages_read = (section.last_page + 1) if section else len(pages)
+        print(f"{name:<16} pages={len(pages)} read={pages_read} "
+              f"section={'%d-%d' % (section.start, section.end) if section else 'none':<11} "
+              f"legacy_found={len(legacy)}")
+    print(f"sections found: compiled {found} of {len(corpus)}, legacy {legacy_found} of {len(corpus)}")
+
+    for label, run in (('legacy per-page find', legacy_scan),
+                       ('pattern per end marker', lambda pages: extractor.scan_pages(iter(pages))),
+                       ('end marker alternation', lambda pages: alternation_extractor.scan_pages(iter(pages)))):
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            for pages in corpus.values():
+                run(pages)
+        elapsed = time.perf_counter() - started
+        documents = args.iterations * len(corpus)
+        print(f"{label:<23} {documents} documents in {elapsed:.3f}s ({elapsed / documents * 1e6:.1f}us/document)")
+
+# Execute the main function
+if __name__ == "__main__":
+    main()
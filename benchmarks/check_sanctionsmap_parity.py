@@ -0,0 +1,51 @@
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay_server import start_server, FIXTURES_DIR
+
+# Function to print the rows that differ between two extraction modes
+def report(label, diff):
+    if diff.empty:
+        print(f"{label}: identical")
+    else:
+        print(f"{label}: {len(diff)} differing rows")
+        print(diff.to_string(index=False))
+    return diff.empty
+
+# Main execution function. The feed sample and the map page under fixtures/www.sanctionsmap.eu are both
+# written by hand, so this checks that the modes agree with each other on the same data; it cannot show
+# that the feed parser reads the live feed correctly.
+def main():
+    parser = argparse.ArgumentParser(description='Compare the sanctions map extraction modes on the hand-made fixtures.')
+    parser.add_argument('--no-browser', action='store_true', help='only run the data feed parser')
+    args = parser.parse_args()
+
+    server, base_url = start_server('www.sanctionsmap.eu')
+    os.environ['SANCTIONSMAP_FEED_URL'] = f'{base_url}/api/v1/regime'
+
+    import data_extraction_column_2 as column_2
+    import driver_pool
+
+    try:
+        feed_df = column_2.scrape_data_from_feed()
+        print(f"feed: {len(feed_df)} measures for {feed_df['Country'].nunique()} countries")
+        if args.no_browser:
+            return
+
+        page_url = 'file://' + os.path.join(FIXTURES_DIR, 'www.sanctionsmap.eu', 'index.html')
+        with driver_pool.DriverPool(size=1) as pool, pool.lease() as driver:
+            page_df = column_2.scrape_data_from_page(driver, page_url).measures
+            click_df = column_2.scrape_data_by_clicks(driver, page_url).measures
+
+        identical = report('feed vs click', column_2.compare_measures(feed_df, click_df))
+        identical = report('page vs click', column_2.compare_measures(page_df, click_df)) and identical
+        sys.exit(0 if identical else 1)
+    finally:
+        server.shutdown()
+
+# Execute the main function
+if __name__ == "__main__":
+    main()
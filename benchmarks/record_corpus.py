@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import mimetypes
+import threading
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay_server import FIXTURES_DIR, MANIFEST_PATH, fixture_path
+
+# Records every response a session receives into the fixtures directory, laid out so that
+# replay_server.py serves each recording at its original path
+class CorpusRecorder:
+    def __init__(self, fixtures_dir=FIXTURES_DIR):
+        self.fixtures_dir = fixtures_dir
+        self.entries = {}
+        self.redirects = {}
+        self.lock = threading.Lock()
+
+    # Response hook for requests sessions
+    def record(self, response, *args, **kwargs):
+        if response.is_redirect:
+            with self.lock:
+                self.redirects[urljoin(response.url, response.headers['location'])] = response.url
+            return
+        if response.status_code != 200:
+            print(f"skipped {response.url} ({response.status_code})")
+            return
+
+        # Reading the body here is safe for streamed responses: iter_content replays it afterwards
+        body = response.content
+        content_type = response.headers.get('content-type', '').split(';')[0].strip() or None
+
+        url = response.url
+        urls = [url]
+        with self.lock:
+            while url in self.redirects:
+                url = self.redirects.pop(url)
+                urls.append(url)
+        for url in urls:
+            self.save(url, body, content_type)
+
+    # Function to write one recording and add it to the manifest entries
+    def save(self, url, body, content_type):
+        path = recording_path(url, content_type)
+        full_path = os.path.join(self.fixtures_dir, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as f:
+            f.write(body)
+
+        with self.lock:
+            self.entries[path] = manifest_entry(path, url, body, content_type,
+                                                recorded_at=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()))
+        print(f"recorded {url} -> {path} ({len(body)} bytes)")
+
+# Function to pick the path of a recording. URLs without an extension are stored as a directory
+# index for HTML and with a .json suffix for API responses, which is where the replay server looks.
+def recording_path(url, content_type):
+    path = fixture_path(url)
+    if os.path.splitext(path)[1]:
+        return path
+    if content_type and 'json' in content_type:
+        return path + '.json'
+    return os.path.join(path, 'index.html')
+
+# Function to describe one fixture in the manifest. Its provenance is 'recorded', with the time it was
+# captured from the live site, or 'synthetic' for a file written by hand.
+def manifest_entry(path, url, body, content_type, recorded_at=None):
+    entry = {'path': path.replace(os.sep, '/'), 'url': url, 'content_type': content_type, 'size': len(body),
+             'sha256': hashlib.sha256(body).hexdigest(), 'provenance': 'recorded' if recorded_at else 'synthetic'}
+    if recorded_at:
+        entry['recorded_at'] = recorded_at
+    return entry
+
+# Function to read the manifest entries keyed by path
+def load_manifest(manifest_path=MANIFEST_PATH):
+    if not os.path.isfile(manifest_path):
+        return {}
+    with open(manifest_path, encoding='utf-8') as f:
+        return {entry['path']: entry for entry in json.load(f).get('entries', [])}
+
+# Function to write the manifest entries, sorted by path
+def write_manifest(entries, manifest_path=MANIFEST_PATH):
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'entries': [entries[path] for path in sorted(entries)]}, f, indent=2)
+        f.write('\n')
+    print(f"wrote {len(entries)} entries to {manifest_path}")
+
+# Function to index the files already in the fixtures directory, keeping recorded URLs and content types.
+# Files without a recording get their content type guessed from the extension. A file only stays 'recorded'
+# while it is unchanged since it was captured; any other file is indexed as synthetic.
+def index_fixtures(fixtures_dir=FIXTURES_DIR, entries=None):
+    entries = dict(entries or {})
+    indexed = {}
+    for root, _, files in os.walk(fixtures_dir):
+        for name in files:
+            full_path = os.path.join(root, name)
+            path = os.path.relpath(full_path, fixtures_dir).replace(os.sep, '/')
+            if full_path == MANIFEST_PATH or '/' not in path:
+                continue
+            with open(full_path, 'rb') as f:
+                body = f.read()
+
+            previous = entries.get(path, {})
+            host, _, rest = path.partition('/')
+            url = previous.get('url') or f"https://{host}/{rest[:-len('index.html')] if rest.endswith('index.html') else rest}"
+            content_type = previous.get('content_type') or mimetypes.guess_type(full_path)[0]
+            recorded = previous.get('provenance') == 'recorded' and previous.get('sha256') == hashlib.sha256(body).hexdigest()
+            indexed[path] = manifest_entry(path, url, body, content_type,
+                                           recorded_at=previous.get('recorded_at') if recorded else None)
+    return indexed
+
+# Function to record the OFAC program index and every program page
+def record_ofac(session):
+    import http_client
+    import data_extraction_column_3 as column_3
+
+    programs = column_3.scrape_program_links_static(column_3.OFAC_PROGRAMS_URL, session)
+    for _, program_url in programs:
+        http_client.get(session, program_url)
+
+# Function to record the sanctions map data feed. The rendered map page is maintained by hand,
+# since it only exists inside a browser.
+def record_sanctionsmap(session):
+    import http_client
+    import data_extraction_column_2 as column_2
+
+    http_client.get(session, column_2.SANCTIONSMAP_FEED_URL)
+
+# Function to record the monthly forecast, its articles and their fact sheet PDFs
+def record_security_council_report(session):
+    import http_client
+    import data_extraction_column_4 as column_4
+
+    for article in column_4.discover_articles(column_4.SCR_FORECAST_URL, session):
+        for _, fact_sheet_href, _ in column_4.extract_fact_sheet_links(article, session):
+            path, _, _, temporary = http_client.download(session, fact_sheet_href)
+            if temporary:
+                os.remove(path)
+
+# Sources that can be recorded
+RECORDERS = {
+    'ofac': record_ofac,
+    'sanctionsmap': record_sanctionsmap,
+    'scr': record_security_council_report,
+}
+
+# Main execution function
+def main():
+    parser = argparse.ArgumentParser(description='Record the live sites into the fixture corpus used by the replay server.')
+    parser.add_argument('sources', nargs='*', help=f"sources to record: {', '.join(sorted(RECORDERS))} (default: all)")
+    parser.add_argument('--index-only', action='store_true', help='only rebuild the manifest from the files on disk')
+    args = parser.parse_args()
+    unknown = sorted(set(args.sources) - set(RECORDERS))
+    if unknown:
+        parser.error(f"unknown sources: {', '.join(unknown)}")
+
+    entries = load_manifest()
+    if not args.index_only:
+        # Record what the sites serve now, not what the HTTP cache holds
+        os.environ['HTTP_CACHE_MODE'] = 'off'
+        import http_client
+
+        recorder = CorpusRecorder()
+        session = http_client.create_session()
+        session.hooks['response'].append(recorder.record)
+        try:
+            for source in args.sources or sorted(RECORDERS):
+                print(f"recording {source}...")
+                RECORDERS[source](session)
+        finally:
+            session.close()
+        entries.update(recorder.entries)
+
+    write_manifest(index_fixtures(entries=entries))
+
+# Execute the main function
+if __name__ == "__main__":
+    main()
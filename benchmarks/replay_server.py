@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import mimetypes
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, unquote
+
+# Directory holding the recorded pages, one sub-directory per host
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures')
+
+# Manifest of the recorded corpus, written by record_corpus.py
+MANIFEST_PATH = os.path.join(FIXTURES_DIR, 'manifest.json')
+
+# Function to map a URL to the path of its recording, relative to the fixtures directory.
+# Directory URLs are stored as index.html; query strings are ignored.
+def fixture_path(url):
+    parsed = urlparse(url)
+    path = unquote(parsed.path).lstrip('/')
+    if not path or path.endswith('/'):
+        path += 'index.html'
+    return os.path.normpath(os.path.join(parsed.netloc, path))
+
+# Function to read the content types recorded in the manifest, keyed by path relative to the fixtures directory
+def load_content_types(manifest_path=MANIFEST_PATH):
+    if not os.path.isfile(manifest_path):
+        return {}
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    return {os.path.normpath(entry['path']): entry['content_type']
+            for entry in manifest.get('entries', []) if entry.get('content_type')}
+
+# Function to build a request handler that serves files from root with injected latency and errors.
+# Latency is a base delay plus up to jitter seconds; error_rate of the responses are error_status.
+def make_handler(root, latency, jitter=0.0, error_rate=0.0, error_status=503, seed=None, content_types=None):
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    content_types = load_content_types() if content_types is None else content_types
+
+    class ReplayHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            path = os.path.normpath(os.path.join(root, unquote(urlparse(self.path).path).lstrip('/')))
+            if os.path.isdir(path):
+                path = os.path.join(path, 'index.html')
+            elif not os.path.exists(path) and os.path.isfile(path + '.json'):
+                # Recorded API responses are stored with a .json suffix
+                path = path + '.json'
+
+            with rng_lock:
+                delay = latency + (rng.uniform(0, jitter) if jitter else 0.0)
+                fail = error_rate and rng.random() < error_rate
+            if delay:
+                time.sleep(delay)
+
+            if fail:
+                self.send_error(error_status)
+                return
+
+            if not path.startswith(root) or not os.path.isfile(path):
+                self.send_error(404)
+                return
+
+            with open(path, 'rb') as f:
+                body = f.read()
+            content_type = (content_types.get(os.path.relpath(path, FIXTURES_DIR))
+                            or mimetypes.guess_type(path)[0] or 'application/octet-stream')
+
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ReplayHandler
+
+# Function to start a replay server on a background thread and return it with its base URL
+def start_server(host_dir, latency=0.0, port=0, jitter=0.0, error_rate=0.0, error_status=503, seed=None):
+    root = os.path.abspath(os.path.join(FIXTURES_DIR, host_dir))
+    handler = make_handler(root, latency, jitter, error_rate, error_status, seed)
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+# Function to start one replay server per recorded host. Returns the servers and a host to base URL map.
+def start_servers(host_dirs=None, **options):
+    host_dirs = host_dirs or sorted(name for name in os.listdir(FIXTURES_DIR)
+                                    if os.path.isdir(os.path.join(FIXTURES_DIR, name)))
+    servers, base_urls = [], {}
+    for host_dir in host_dirs:
+        server, base_url = start_server(host_dir, **options)
+        servers.append(server)
+        base_urls[host_dir] = base_url
+    return servers, base_urls
+
+# Main execution function
+def main():
+    parser = argparse.ArgumentParser(description='Serve recorded pages from the fixtures directory.')
+    parser.add_argument('host_dir', help='fixture sub-directory to serve, e.g. ofac.treasury.gov')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before each response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many extra seconds per response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of responses that fail')
+    parser.add_argument('--error-status', type=int, default=503, help='status code of the failed responses')
+    parser.add_argument('--seed', type=int, default=None, help='seed for reproducible jitter and errors')
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.host_dir, args.latency, args.port, args.jitter,
+                                    args.error_rate, args.error_status, args.seed)
+    print(f"Serving {args.host_dir} at {base_url} (latency {args.latency}s, jitter {args.jitter}s, "
+          f"error rate {args.error_rate:.0%})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
+
+# Execute the main function
+if __name__ == "__main__":
+    main()
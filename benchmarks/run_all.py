@@ -0,0 +1,160 @@
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay_server import FIXTURES_DIR, start_servers
+
+# Function to point every scraper at the replay servers. Runs before the scrapers are imported,
+# since they read their URLs from the environment at import time.
+def configure_environment(base_urls, db_path):
+    os.environ['OFAC_BASE_URL'] = base_urls['ofac.treasury.gov']
+    os.environ['SANCTIONSMAP_URL'] = base_urls['www.sanctionsmap.eu'] + '/'
+    os.environ['SANCTIONSMAP_FEED_URL'] = base_urls['www.sanctionsmap.eu'] + '/api/v1/regime'
+    os.environ['SCR_BASE_URL'] = base_urls['www.securitycouncilreport.org']
+    # Measure the fetches themselves, not the HTTP cache
+    os.environ['HTTP_CACHE_MODE'] = 'off'
+    os.environ['DB_URL'] = f'sqlite:///{db_path}'
+    os.environ['CRAWL_FRONTIER_PATH'] = os.path.join(os.path.dirname(db_path), 'crawl_frontier.sqlite')
+
+# Function to time func over repeat runs and measure its peak traced memory in one more run.
+# Returns the result of the last run and its measurements; count_of gives the number of items processed.
+def measure(name, func, count_of=len, repeat=1):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = min(timings)
+    items = count_of(result)
+    stats = {'seconds': seconds, 'items': items, 'items_per_second': items / seconds if seconds else 0.0,
+             'peak_mb': peak / 1024 / 1024}
+    print(f"{name:<20} items={items:<6} time={seconds:.3f}s items/s={stats['items_per_second']:.1f} "
+          f"peak={stats['peak_mb']:.1f}MB")
+    return result, stats
+
+# Function to load the extracted fact sheet text, one list of pages per document
+def load_fact_sheet_pages():
+    documents = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'www.securitycouncilreport.org', 'fact-sheet-text', '*.txt'))):
+        with open(path, encoding='utf-8') as f:
+            documents.append(f.read().split('\f'))
+    return documents
+
+# Function to run every stage against the replay servers and return the measurements per stage
+def run_benchmarks(repeat, workers, copies):
+    import pandas as pd
+    import data_extraction_column_2 as column_2
+    import data_extraction_column_3 as column_3
+    import data_extraction_column_4 as column_4
+    import consolidation
+    import excel_export
+    from section_extractor import get_extractor
+    from db_writer import bulk_load, upsert_frame
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {}
+
+    orders_df, results['ofac'] = measure(
+        'ofac', lambda: column_3.scrape_active_sanction_programs(column_3.OFAC_PROGRAMS_URL, max_workers=workers),
+        repeat=repeat)
+
+    # Only the experimental feed parser is measured. The browser modes that read the sanctions map by default
+    # need Chrome and are left out of the corpus benchmark.
+    measures_df, results['sanctionsmap_feed'] = measure('sanctionsmap_feed', column_2.scrape_data_from_feed, repeat=repeat)
+    print(f"{'sanctionsmap_page':<20} not measured: the browser modes need Chrome")
+
+    sanctions, results['scr_fact_sheets'] = measure('scr_fact_sheets', column_4.scrape_security_council_reports,
+                                                    repeat=repeat)
+    sanctions_df = pd.DataFrame(sanctions, columns=["Country", "Type of Sanctions"])
+
+    extractor = get_extractor(column_4.start_keyword, tuple(column_4.end_keywords))
+    documents = load_fact_sheet_pages() * copies
+    _, results['section_extraction'] = measure(
+        'section_extraction', lambda: [extractor.scan_pages(iter(pages)) for pages in documents], repeat=repeat)
+
+    # Scale the scraped frames up so consolidation and the database write see a realistic volume
+    frames = [pd.concat([df] * copies, ignore_index=True) for df in (measures_df, orders_df, sanctions_df)]
+    final, results['consolidation'] = measure('consolidation', lambda: consolidation.consolidate(*frames),
+                                              count_of=lambda final: sum(len(frame) for frame in frames), repeat=repeat)
+
+    workbook_path = os.path.join(tempfile.mkdtemp(), 'final.xlsx')
+    _, results['excel_export'] = measure('excel_export', lambda: excel_export.export_frame(final, workbook_path),
+                                         count_of=lambda rows: rows, repeat=repeat)
+
+    _, results['db_bulk_load'] = measure('db_bulk_load', lambda: bulk_load(final, 'abl_data'),
+                                         count_of=lambda rows: rows, repeat=repeat)
+    _, results['db_upsert'] = measure(
+        'db_upsert', lambda: upsert_frame(frames[1], 'executive_orders', ['Country', 'Executive Orders']),
+        count_of=lambda counts: len(frames[1]), repeat=repeat)
+
+    return results
+
+# Function to compare the measurements with a baseline. Returns the stages that got slower
+# or used more memory than the tolerance allows.
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for stage, stats in results.items():
+        previous = baseline.get(stage)
+        if not previous:
+            continue
+        for metric in ('seconds', 'peak_mb'):
+            if previous[metric] and stats[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{stage} {metric}: {previous[metric]:.3f} -> {stats[metric]:.3f}")
+    return regressions
+
+# Main execution function
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every scraper, consolidation and the database write offline.')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage; the fastest is reported')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent OFAC program page fetches')
+    parser.add_argument('--copies', type=int, default=20, help='copies of the corpus used for the in-memory stages')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds of latency per response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many extra seconds per response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of responses that fail with 503')
+    parser.add_argument('--seed', type=int, default=0, help='seed for reproducible jitter and errors')
+    parser.add_argument('--save', help='write the measurements to this JSON file')
+    parser.add_argument('--baseline', help='JSON file of earlier measurements to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown or memory growth over the baseline')
+    args = parser.parse_args()
+
+    servers, base_urls = start_servers(latency=args.latency, jitter=args.jitter,
+                                       error_rate=args.error_rate, seed=args.seed)
+    db_dir = tempfile.mkdtemp()
+    configure_environment(base_urls, os.path.join(db_dir, 'bench.db'))
+
+    try:
+        results = run_benchmarks(args.repeat, args.workers, args.copies)
+    finally:
+        for server in servers:
+            server.shutdown()
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+# Execute the main function
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from country_resolver import canonical_names
+
+# Columns of the consolidated sheet
+COLUMNS = ["Country", "Restrictive Measures", "Executive Orders", "Type of Sanctions"]
+
+# Column of the restrictive measures frame naming the sanctions map row each measure was read from.
+# A country can have several rows (one per sanctions regime); like the notebook, the measures of a row
+# are joined as bullets and the rows of a country are separated by a newline.
+ENTRY_COLUMN = 'Entry'
+
+# Function to join string values per group code without a Python call per group. The values are stable-sorted
+# by code, so every group keeps the order of its values, and each run of equal codes becomes one list that
+# Arrow joins in C++. Returns the group codes, ascending, and their joined values.
+def join_groups(values, codes, separator):
+    if len(values) == 0:
+        return codes[:0], np.array([], dtype=object)
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    offsets = pa.array(np.append(starts, len(sorted_codes)), type=pa.int64())
+    lists = pa.LargeListArray.from_arrays(offsets, pa.array(values[order], type=pa.large_string()))
+    return sorted_codes[starts], pc.binary_join(lists, pa.scalar(separator, pa.large_string())).to_numpy(zero_copy_only=False)
+
+# Function to turn the restrictive measures rows into one bulleted entry per country. The bullets of each
+# sanctions map row are joined together, then the rows of a country are joined with a newline. Without an
+# ENTRY_COLUMN, all the measures of a country count as one row.
+def prepare_restrictive_measures(df):
+    measures = df.dropna(subset=['Country', 'Restrictive Measures'])
+    bulleted = ('\n● ' + measures['Restrictive Measures'].astype(str)).to_numpy(dtype=object)
+    entries = measures[ENTRY_COLUMN].fillna(measures['Country']) if ENTRY_COLUMN in measures else measures['Country']
+    # Rows and countries keep the order they first appear in
+    entry_codes, entry_keys = pd.MultiIndex.from_arrays([measures['Country'], entries]).factorize(sort=False)
+    entry_group_codes, entry_text = join_groups(bulleted, entry_codes, '')
+    country_codes, countries = pd.factorize(entry_keys.get_level_values(0)[entry_group_codes], sort=False)
+    group_codes, joined = join_groups(entry_text, country_codes, '\n')
+    grouped = pd.DataFrame({'Country': countries[group_codes], 'Restrictive Measures': joined})
+    return grouped.reindex(columns=COLUMNS)
+
+# Function to bullet the executive orders
+def prepare_executive_orders(df):
+    orders = df.dropna(subset=['Executive Orders']).copy()
+    orders['Executive Orders'] = '\n•' + orders['Executive Orders'].astype(str)
+    return orders.reindex(columns=COLUMNS)
+
+# Function to align the types of sanctions rows with the consolidated columns
+def prepare_type_of_sanctions(df):
+    return df.reindex(columns=COLUMNS)
+
+# Function to consolidate frames that already have the consolidated columns into one row per known country.
+# The scrapers key their rows by canonical country name, so this is an exact keyed join.
+# Countries are mapped to categorical codes once, rows of unknown countries are dropped (the inner merge
+# with the countries list), and every column is joined per country with one Arrow list join over the codes.
+# Values keep the order of the frames and of the rows within them; countries are sorted by name.
+def consolidate_frames(frames, countries_df=None):
+    countries = canonical_names() if countries_df is None else countries_df['Country'].dropna().unique()
+    country_type = pd.CategoricalDtype(np.sort(countries))
+    present = np.zeros(len(country_type.categories), dtype=bool)
+
+    codes = []
+    for frame in frames:
+        frame_codes = country_type.categories.get_indexer(frame['Country'])
+        present[frame_codes[frame_codes >= 0]] = True
+        codes.append(frame_codes)
+
+    present_codes = np.flatnonzero(present)
+    final = pd.DataFrame({'Country': np.asarray(country_type.categories[present_codes], dtype=object)})
+
+    for column in COLUMNS[1:]:
+        values = []
+        value_codes = []
+        for frame, frame_codes in zip(frames, codes):
+            if column not in frame:
+                continue
+            keep = (frame_codes >= 0) & frame[column].notna().to_numpy()
+            values.append(frame[column][keep].astype(str).to_numpy())
+            value_codes.append(frame_codes[keep])
+
+        column_values = np.full(len(present_codes), '', dtype=object)
+        if values:
+            group_codes, joined = join_groups(np.concatenate(values), np.concatenate(value_codes), ' ')
+            column_values[np.searchsorted(present_codes, group_codes)] = joined
+        final[column] = column_values
+
+    return final
+
+# Function to consolidate the three sources into one row per country in the countries list
+def consolidate(measures_df, orders_df, sanctions_df, countries_df=None):
+    return consolidate_frames([prepare_restrictive_measures(measures_df),
+                               prepare_executive_orders(orders_df),
+                               prepare_type_of_sanctions(sanctions_df)], countries_df)
@@ -0,0 +1,168 @@
+import re
+import logging
+import difflib
+import threading
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+# Canonical country names with their ISO 3166-1 alpha-2 codes. Regions and territories that the
+# sanctions programs are named after are included; 'Balkans' has no ISO code.
+COUNTRIES = {
+    "Afghanistan": "AF", "Albania": "AL", "Algeria": "DZ", "Andorra": "AD", "Angola": "AO",
+    "Antigua and Barbuda": "AG", "Argentina": "AR", "Armenia": "AM", "Australia": "AU", "Austria": "AT",
+    "Azerbaijan": "AZ", "Bahamas": "BS", "Bahrain": "BH", "Balkans": None, "Bangladesh": "BD",
+    "Barbados": "BB", "Belarus": "BY", "Belgium": "BE", "Belize": "BZ", "Benin": "BJ", "Bhutan": "BT",
+    "Bolivia": "BO", "Bosnia & Herzegovina": "BA", "Botswana": "BW", "Brazil": "BR", "Brunei": "BN",
+    "Bulgaria": "BG", "Burkina Faso": "BF", "Burundi": "BI", "Cabo Verde": "CV", "Cambodia": "KH",
+    "Cameroon": "CM", "Canada": "CA", "Cayman Islands": "KY", "Central African Republic": "CF", "Chad": "TD",
+    "Chile": "CL", "China": "CN", "Colombia": "CO", "Comoros": "KM", "Congo": "CG", "Costa Rica": "CR",
+    "Croatia": "HR", "Cuba": "CU", "Cyprus": "CY", "Czech Republic": "CZ",
+    "Democratic Republic of the Congo": "CD", "Denmark": "DK", "Djibouti": "DJ", "Dominica": "DM",
+    "Dominican Republic": "DO", "Ecuador": "EC", "Egypt": "EG", "El Salvador": "SV",
+    "Equatorial Guinea": "GQ", "Eritrea": "ER", "Estonia": "EE", "Eswatini": "SZ", "Ethiopia": "ET",
+    "Fiji": "FJ", "Finland": "FI", "France": "FR", "Gabon": "GA", "Gambia": "GM", "Georgia": "GE",
+    "Germany": "DE", "Ghana": "GH", "Gibraltar": "GI", "Greece": "GR", "Grenada": "GD", "Guatemala": "GT",
+    "Guinea": "GN", "Guinea-Bissau": "GW", "Guyana": "GY", "Haiti": "HT", "Honduras": "HN",
+    "Hong Kong": "HK", "Hungary": "HU", "Iceland": "IS", "India": "IN", "Indonesia": "ID", "Iran": "IR",
+    "Iraq": "IQ", "Ireland": "IE", "Israel": "IL", "Italy": "IT", "Jamaica": "JM", "Japan": "JP",
+    "Jordan": "JO", "Kazakhstan": "KZ", "Kenya": "KE", "Kiribati": "KI", "Kosovo": "XK", "Kuwait": "KW",
+    "Kyrgyzstan": "KG", "Laos": "LA", "Latvia": "LV", "Lebanon": "LB", "Lesotho": "LS", "Liberia": "LR",
+    "Libya": "LY", "Liechtenstein": "LI", "Lithuania": "LT", "Luxembourg": "LU", "Madagascar": "MG",
+    "Malawi": "MW", "Malaysia": "MY", "Maldives": "MV", "Mali": "ML", "Malta": "MT",
+    "Marshall Islands": "MH", "Mauritania": "MR", "Mauritius": "MU", "Mexico": "MX", "Micronesia": "FM",
+    "Moldova": "MD", "Monaco": "MC", "Mongolia": "MN", "Montenegro": "ME", "Morocco": "MA",
+    "Mozambique": "MZ", "Myanmar": "MM", "Namibia": "NA", "Nauru": "NR", "Nepal": "NP",
+    "Netherlands": "NL", "New Zealand": "NZ", "Nicaragua": "NI", "Niger": "NE", "Nigeria": "NG",
+    "North Korea": "KP", "North Macedonia": "MK", "Norway": "NO", "Oman": "OM", "Pakistan": "PK",
+    "Palau": "PW", "Panama": "PA", "Papua New Guinea": "PG", "Paraguay": "PY", "Peru": "PE",
+    "Philippines": "PH", "Poland": "PL", "Portugal": "PT", "Qatar": "QA", "Romania": "RO", "Russia": "RU",
+    "Rwanda": "RW", "Saint Kitts and Nevis": "KN", "Saint Lucia": "LC",
+    "Saint Vincent and the Grenadines": "VC", "Samoa": "WS", "San Marino": "SM",
+    "Sao Tome and Principe": "ST", "Saudi Arabia": "SA", "Senegal": "SN", "Serbia": "RS",
+    "Seychelles": "SC", "Sierra Leone": "SL", "Singapore": "SG", "Slovakia": "SK", "Slovenia": "SI",
+    "Solomon Islands": "SB", "Somalia": "SO", "South Africa": "ZA", "South Korea": "KR",
+    "South Sudan": "SS", "Spain": "ES", "Sri Lanka": "LK", "Sudan": "SD", "Suriname": "SR", "Sweden": "SE",
+    "Switzerland": "CH", "Syria": "SY", "Taiwan": "TW", "Tajikistan": "TJ", "Tanzania": "TZ",
+    "Thailand": "TH", "Timor-Leste": "TL", "Togo": "TG", "Tonga": "TO", "Trinidad and Tobago": "TT",
+    "Tunisia": "TN", "Turkey": "TR", "Turkmenistan": "TM", "Tuvalu": "TV", "Uganda": "UG", "Ukraine": "UA",
+    "United Arab Emirates": "AE", "United Kingdom": "GB", "United States": "US", "Uruguay": "UY",
+    "Uzbekistan": "UZ", "Vanuatu": "VU", "Vatican City": "VA", "Venezuela": "VE", "Vietnam": "VN",
+    "Yemen": "YE", "Zambia": "ZM", "Zimbabwe": "ZW",
+}
+
+# Other spellings used by the sources, mapped to the canonical name
+ALIASES = {
+    "Burma": "Myanmar", "Myanmar (Burma)": "Myanmar",
+    "Korea, North": "North Korea", "DPRK": "North Korea", "DPRK (North Korea)": "North Korea",
+    "Democratic People's Republic of Korea": "North Korea",
+    "Democratic People's Republic of Korea (DPRK – North Korea)": "North Korea",
+    "Korea, South": "South Korea", "Republic of Korea": "South Korea",
+    "DRC": "Democratic Republic of the Congo", "Congo, Democratic Republic of the": "Democratic Republic of the Congo",
+    "Republic of the Congo": "Congo", "Cayman Island": "Cayman Islands",
+    "The United Arab Emirates": "United Arab Emirates", "UAE": "United Arab Emirates",
+    "United States of America": "United States", "USA": "United States", "UK": "United Kingdom",
+    "Russian Federation": "Russia", "Russian Harmful Foreign Activities": "Russia",
+    "Syrian Arab Republic": "Syria", "Iran, Islamic Republic of": "Iran", "Türkiye": "Turkey",
+    "Czechia": "Czech Republic", "Swaziland": "Eswatini", "Cape Verde": "Cabo Verde",
+    "East Timor": "Timor-Leste", "Holy See": "Vatican City", "Macedonia": "North Macedonia",
+    "Lao People's Democratic Republic": "Laos", "Viet Nam": "Vietnam", "Western Balkans": "Balkans",
+    "Sudan and Darfur": "Sudan", "Darfur": "Sudan",
+}
+
+# Words that OFAC and the other sources append to country names in program titles
+PROGRAM_SUFFIX_PATTERN = re.compile(r'\b(?:related|sanctions?|program|regime)\b')
+
+# Fuzzy matches must be at least this similar to an index entry
+FUZZY_CUTOFF = 0.85
+
+# Function to normalize a name for lookups: accents, case, '&', punctuation and spacing are ignored
+def normalize(name):
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    text = text.casefold().replace('&', ' and ')
+    text = re.sub(r"[^a-z0-9]+", ' ', text).strip()
+    return re.sub(r'^the ', '', text)
+
+# Precomputed index of every canonical name and alias, keyed by normalized name
+NAME_INDEX = {normalize(name): name for name in COUNTRIES}
+NAME_INDEX.update({normalize(alias): name for alias, name in ALIASES.items()})
+
+# Index of ISO alpha-2 codes
+CODE_INDEX = {code: name for name, code in COUNTRIES.items() if code}
+
+# Names that could not be resolved, with how often they were seen
+_unmatched = Counter()
+_unmatched_lock = threading.Lock()
+
+# Function to find the best fuzzy match for a normalized name, cached per name
+@lru_cache(maxsize=4096)
+def fuzzy_lookup(key):
+    matches = difflib.get_close_matches(key, NAME_INDEX.keys(), n=1, cutoff=FUZZY_CUTOFF)
+    return NAME_INDEX[matches[0]] if matches else None
+
+# Function to resolve one name to its canonical country name, or None when it does not name a country
+def resolve(name):
+    if name is None or not str(name).strip():
+        return None
+
+    raw = str(name).strip()
+    if raw in CODE_INDEX:
+        return CODE_INDEX[raw]
+
+    # Exact lookups first: the name as given, then without program suffixes, then without
+    # or inside any parenthesised part
+    candidates = [raw, PROGRAM_SUFFIX_PATTERN.sub(' ', raw.casefold())]
+    if '(' in raw:
+        outside = re.sub(r'\([^)]*\)', ' ', raw)
+        candidates += [outside, PROGRAM_SUFFIX_PATTERN.sub(' ', outside.casefold())]
+        candidates += re.findall(r'\(([^)]*)\)', raw)
+
+    keys = [normalize(candidate) for candidate in candidates]
+    for key in keys:
+        if key in NAME_INDEX:
+            return NAME_INDEX[key]
+
+    for key in keys:
+        if key:
+            match = fuzzy_lookup(key)
+            if match:
+                return match
+
+    with _unmatched_lock:
+        _unmatched[raw] += 1
+    return None
+
+# Function to resolve a name that may list several countries, such as 'Ukraine-/Russia-Related Sanctions'
+def resolve_many(name):
+    resolved = []
+    for part in str(name).split('/'):
+        country = resolve(part)
+        if country and country not in resolved:
+            resolved.append(country)
+    if not resolved and '/' in str(name):
+        # Record the full name rather than its fragments
+        with _unmatched_lock:
+            for part in str(name).split('/'):
+                _unmatched.pop(part.strip(), None)
+            _unmatched[str(name).strip()] += 1
+    return resolved
+
+# Function to return the ISO alpha-2 code of a canonical name
+def iso_code(name):
+    return COUNTRIES.get(name)
+
+# Function to return the canonical country names, sorted
+def canonical_names():
+    return sorted(COUNTRIES)
+
+# Function to return the names that could not be resolved so far, most frequent first
+def unmatched_names():
+    with _unmatched_lock:
+        return dict(_unmatched.most_common())
+
+# Function to log the names that could not be resolved, so rows are not dropped silently
+def report_unmatched():
+    unmatched = unmatched_names()
+    if unmatched:
+        logging.warning(f"{len(unmatched)} names did not match a country: {', '.join(unmatched)}")
+    return unmatched
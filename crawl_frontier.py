@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+import metrics
+import http_client
+
+# Load environment variables
+load_dotenv()
+
+# SQLite file holding the state of every crawled item
+CRAWL_FRONTIER_PATH = os.getenv('CRAWL_FRONTIER_PATH', 'crawl_frontier.sqlite')
+
+# Resume mode reuses the results of items completed by an earlier run instead of fetching them again
+CRAWL_RESUME = os.getenv('CRAWL_RESUME', 'false').lower() == 'true'
+
+# Extra attempts an item gets within a run, and the backoff between attempts, which doubles
+# after every failure up to CRAWL_BACKOFF_MAX seconds
+CRAWL_RETRIES = int(os.getenv('CRAWL_RETRIES', 1))
+CRAWL_BACKOFF_SECONDS = float(os.getenv('CRAWL_BACKOFF_SECONDS', 2))
+CRAWL_BACKOFF_MAX = float(os.getenv('CRAWL_BACKOFF_MAX', 60))
+
+# States of an item
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+# Log function to standardize logging
+def log_message(level, message):
+    if level == 'info':
+        logging.info(message)
+    elif level == 'debug':
+        logging.debug(message)
+    elif level == 'error':
+        logging.error(message)
+    else:
+        logging.warning(message)
+
+# Persistent crawl frontier. Every item a scraper discovers (a program page, a country, a fact sheet)
+# is a row keyed by its source and key, with its state, number of attempts, last error and parsed
+# result stored as JSON. A run that is not resuming clears a source the first time it touches it;
+# a resuming run keeps completed items and only fetches the pending and failed ones.
+class Frontier:
+    def __init__(self, path=CRAWL_FRONTIER_PATH, resume=CRAWL_RESUME, retries=CRAWL_RETRIES,
+                 backoff=CRAWL_BACKOFF_SECONDS, backoff_max=CRAWL_BACKOFF_MAX):
+        self.path = path
+        self.resume = resume
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.lock = threading.Lock()
+        self.sources = set()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS items (
+                source TEXT NOT NULL,
+                key TEXT NOT NULL,
+                label TEXT,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                result TEXT,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (source, key))''')
+
+    @contextmanager
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # Function to clear the items left by an earlier run the first time a fresh run touches a source
+    def prepare(self, source):
+        with self.lock:
+            if source in self.sources:
+                return
+            self.sources.add(source)
+            if not self.resume:
+                with self.connect() as conn:
+                    conn.execute('DELETE FROM items WHERE source = ?', (source,))
+
+    # Function to register discovered items as pending, keeping the state of the ones already known.
+    # items are (key, label) pairs.
+    def add(self, source, items):
+        self.prepare(source)
+        now = time.time()
+        with self.lock, self.connect() as conn:
+            conn.executemany('INSERT OR IGNORE INTO items (source, key, label, state, updated_at) VALUES (?, ?, ?, ?, ?)',
+                             [(source, key, label, PENDING, now) for key, label in items])
+
+    # Function to return an item as a dict, or None when it is unknown
+    def get(self, source, key):
+        self.prepare(source)
+        with self.lock, self.connect() as conn:
+            row = conn.execute('SELECT label, state, attempts, last_error, result, next_attempt FROM items '
+                               'WHERE source = ? AND key = ?', (source, key)).fetchone()
+        if row is None:
+            return None
+        item = dict(zip(('label', 'state', 'attempts', 'last_error', 'result', 'next_attempt'), row))
+        item['result'] = json.loads(item['result']) if item['result'] is not None else None
+        return item
+
+    # Function to return the stored item when resuming and it was completed, or None
+    def completed(self, source, key):
+        if not self.resume:
+            return None
+        item = self.get(source, key)
+        if item is None or item['state'] != DONE:
+            return None
+        metrics.increment('frontier_items_reused', source=source)
+        return item
+
+    # Function to mark an item as done and store its parsed result
+    def complete(self, source, key, result=None, label=None):
+        self.prepare(source)
+        with self.lock, self.connect() as conn:
+            conn.execute('''INSERT INTO items (source, key, label, state, attempts, result, updated_at)
+                            VALUES (?, ?, ?, ?, 1, ?, ?)
+                            ON CONFLICT (source, key) DO UPDATE SET
+                                label = COALESCE(excluded.label, label), state = excluded.state,
+                                attempts = attempts + 1, last_error = NULL, result = excluded.result,
+                                next_attempt = 0, updated_at = excluded.updated_at''',
+                         (source, key, label, DONE, json.dumps(result), time.time()))
+
+    # Function to mark an attempt at an item as failed. The next attempt is held back by a backoff
+    # that doubles with every failure. Returns the number of attempts so far.
+    def fail(self, source, key, error, label=None):
+        self.prepare(source)
+        now = time.time()
+        with self.lock, self.connect() as conn:
+            row = conn.execute('SELECT attempts FROM items WHERE source = ? AND key = ?', (source, key)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            next_attempt = now + min(self.backoff * 2 ** (attempts - 1), self.backoff_max)
+            conn.execute('''INSERT INTO items (source, key, label, state, attempts, last_error, next_attempt, updated_at)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                            ON CONFLICT (source, key) DO UPDATE SET
+                                label = COALESCE(excluded.label, label), state = excluded.state,
+                                attempts = excluded.attempts, last_error = excluded.last_error,
+                                next_attempt = excluded.next_attempt, updated_at = excluded.updated_at''',
+                         (source, key, label, FAILED, attempts, str(error) or type(error).__name__, next_attempt, now))
+        metrics.increment('frontier_item_failures', source=source)
+        return attempts
+
+    # Function to forget an item, e.g. a failed attempt that a fallback has since replaced
+    def discard(self, source, key):
+        self.prepare(source)
+        with self.lock, self.connect() as conn:
+            conn.execute('DELETE FROM items WHERE source = ? AND key = ?', (source, key))
+
+    # Function to sleep until the backoff of a failed item has passed. The host slot of run_concurrent
+    # is released meanwhile, so the other items of the host are fetched during the backoff.
+    def wait(self, item):
+        if item and item['state'] == FAILED:
+            delay = item['next_attempt'] - time.time()
+            if delay > 0:
+                http_client.sleep(delay)
+
+    # Function to call func for an item, recording every failed call and retrying it after its backoff.
+    # The last error is raised. The item is not marked as done; see fetch.
+    def attempt(self, source, key, func, label=None, retries=None):
+        item = self.get(source, key)
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            self.wait(item)
+            try:
+                return func()
+            except Exception as e:
+                attempts = self.fail(source, key, e, label)
+                if attempt == retries:
+                    raise
+                log_message('warning', f'Attempt {attempts} at {key} failed, retrying: {e}')
+                item = self.get(source, key)
+
+    # Function to return the result of an item, reusing it when resuming and otherwise calling func
+    # with retries, then storing what it returned
+    def fetch(self, source, key, func, label=None, retries=None):
+        stored = self.completed(source, key)
+        if stored is not None:
+            return stored['result']
+
+        result = self.attempt(source, key, func, label, retries)
+        self.complete(source, key, result, label)
+        return result
+
+    # Function to list the items that are not done, of the given sources or of every source this run touched
+    def missing(self, sources=None):
+        sources = sorted(sources or self.sources)
+        if not sources:
+            return []
+        with self.lock, self.connect() as conn:
+            rows = conn.execute(f'''SELECT source, key, label, state, attempts, last_error FROM items
+                                    WHERE state != ? AND source IN ({', '.join('?' * len(sources))})
+                                    ORDER BY source, key''', [DONE] + sources).fetchall()
+        return [dict(zip(('source', 'key', 'label', 'state', 'attempts', 'last_error'), row)) for row in rows]
+
+    # Function to count the items of every state per source
+    def summary(self, sources=None):
+        sources = sorted(sources or self.sources)
+        counts = {source: {} for source in sources}
+        if not sources:
+            return counts
+        with self.lock, self.connect() as conn:
+            for source, state, count in conn.execute(f'''SELECT source, state, COUNT(*) FROM items
+                                                         WHERE source IN ({', '.join('?' * len(sources))})
+                                                         GROUP BY source, state''', sources):
+                counts[source][state] = count
+        return counts
+
+    # Function to log every item that is missing from the run, so a partial failure can be resumed
+    # instead of crawling everything again. Returns the missing items.
+    def report_missing(self, sources=None):
+        missing = self.missing(sources)
+        for source, counts in self.summary(sources).items():
+            log_message('info', f"Crawl frontier {source}: " +
+                        ', '.join(f'{count} {state}' for state, count in sorted(counts.items())))
+        for item in missing:
+            error = f": {item['last_error']}" if item['last_error'] else ''
+            log_message('warning', f"Missing from {item['source']}: {item['label'] or item['key']} "
+                                   f"({item['state']}, {item['attempts']} attempts){error}")
+        if missing:
+            log_message('warning', f'{len(missing)} items are missing; run again with --resume (or CRAWL_RESUME=true) '
+                                   'to fetch only those.')
+        return missing
+
+# Frontier shared by every scraper in the process, created on first use
+_default_frontier = None
+_default_frontier_lock = threading.Lock()
+
+def default_frontier():
+    global _default_frontier
+    with _default_frontier_lock:
+        if _default_frontier is None:
+            _default_frontier = Frontier()
+        return _default_frontier
+
+# Function to replace the shared frontier, e.g. to resume from the command line
+def configure(path=CRAWL_FRONTIER_PATH, resume=CRAWL_RESUME):
+    global _default_frontier
+    with _default_frontier_lock:
+        _default_frontier = Frontier(path, resume)
+        return _default_frontier
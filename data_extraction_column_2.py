@@ -1,102 +1,394 @@
 import os
 import time
+import hashlib
+import logging
+from collections import namedtuple
 import pandas as pd
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException
-from sqlalchemy import create_engine
 from dotenv import load_dotenv
+import http_client
+import driver_pool
+import metrics
+import crawl_frontier
+import snapshots
+from db_writer import upsert_frame
+from country_resolver import resolve
+from consolidation import ENTRY_COLUMN
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Retrieve credentials from environment variables
-DB_USERNAME = os.getenv('DB_USERNAME')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_DSN = os.getenv('DB_DSN')
-CHROME_DRIVER_PATH = os.getenv('CHROME_DRIVER_PATH')
+# Retrieve URLs from environment variables
+SANCTIONSMAP_URL = os.getenv('SANCTIONSMAP_URL', 'https://www.sanctionsmap.eu/#/main')
+SANCTIONSMAP_FEED_URL = os.getenv('SANCTIONSMAP_FEED_URL', 'https://www.sanctionsmap.eu/api/v1/regime')
+
+# Extraction mode: 'page' clicks every measure popover inside one script call and 'click' clicks them one
+# WebDriver call at a time. 'feed' is experimental: it reads a JSON data feed without a browser, but its parser
+# was written against a hand-made sample, not a recorded response, so it is not the default.
+# Each mode falls back to the next.
+SANCTIONSMAP_MODE = os.getenv('SANCTIONSMAP_MODE', 'page')
+
+# Crawl frontier sources of the data feed and of the countries read by clicking
+SANCTIONSMAP_SOURCE = 'sanctionsmap'
+SANCTIONSMAP_COUNTRIES_SOURCE = 'sanctionsmap_countries'
+
+# When on, the browser only opens the popovers of countries whose row changed since the last snapshot
+# and reuses the stored measures of the others
+SANCTIONSMAP_FINGERPRINTS = os.getenv('SANCTIONSMAP_FINGERPRINTS', 'true').lower() != 'false'
+
+# Snapshot frame holding the measures and row fingerprint of every country read in the browser
+SANCTIONSMAP_ROWS_FRAME = 'sanctionsmap_rows'
+ROW_COLUMNS = ["Key", "Country", "Fingerprint", "Restrictive Measures"]
+
+# Setup logging configuration, at LOG_LEVEL
+metrics.configure_logging()
+
+# Columns of the restrictive measures table
+MEASURE_COLUMNS = ["Country", "Restrictive Measures", "Executive Orders", "Type of Sanctions"]
+
+# Script run inside the page to read the visible content of every row without opening any popover.
+# Rows without a country come back as null, so indexes match the filter-list elements.
+ROW_CONTENT_SCRIPT = """
+return Array.prototype.map.call(document.querySelectorAll('.filter-list'), function (ul) {
+    var country = ul.querySelector('li[data-heading="Country or Category"] div a');
+    return country ? [country.innerText.trim(), ul.innerText] : null;
+});
+"""
+
+# Script run inside the page to click every measure and read its popover in a single round trip.
+# It does not read the application's data: every click still opens a popover and re-renders it,
+# it only saves the WebDriver round trips of clicking from Python.
+# Takes the indexes of the rows to read, or null for every row; returns (row index, country, measure) rows.
+CLICK_POPOVERS_SCRIPT = """
+var only = arguments[0];
+var rows = [];
+document.querySelectorAll('.filter-list').forEach(function (ul, index) {
+    var country = ul.querySelector('li[data-heading="Country or Category"] div a');
+    var measures = ul.querySelector('li[data-heading="Restrictive measures"]');
+    if (!country || !measures || (only && only.indexOf(index) < 0)) {
+        return;
+    }
+    measures.querySelectorAll('li').forEach(function (li) {
+        var div = li.querySelector('div');
+        if (!div) {
+            return;
+        }
+        div.click();
+        var popover = document.querySelector('.popover-content');
+        rows.push([index, country.innerText.trim(), popover ? popover.innerText.trim() : null]);
+    });
+});
+return rows;
+"""
+
+# Result of reading the sanctions map: the restrictive measures frame, the rows and fingerprints to save with
+# the run snapshot (None when the feed was read) and the countries that could not be read
+Crawl = namedtuple('Crawl', ['measures', 'rows', 'failed'])
 
 # Function to log messages with different levels
 def log_message(level, message):
     if level == 'info':
-        print(f"[INFO] {message}")
+        logging.info(message)
     elif level == 'debug':
-        print(f"[DEBUG] {message}")
+        logging.debug(message)
     elif level == 'error':
-        print(f"[ERROR] {message}")
+        logging.error(message)
+    else:
+        logging.warning(message)
+
+# Function to build the restrictive measures DataFrame from (entry, country, measure) rows, keyed by
+# canonical country name where the country is known. The entry names the sanctions map row of the measure.
+def build_measures_frame(rows):
+    df = pd.DataFrame([(entry, resolve(country) or country, measure) for entry, country, measure in rows],
+                      columns=[ENTRY_COLUMN, "Country", "Restrictive Measures"])
+    df['Executive Orders'] = None
+    df['Type of Sanctions'] = None
+    return df[MEASURE_COLUMNS + [ENTRY_COLUMN]]
+
+# Function to key a sanctions map row by its country, numbering the countries that have several rows
+def row_key(seen, country_text):
+    seen[country_text] = seen.get(country_text, 0) + 1
+    return country_text if seen[country_text] == 1 else f'{country_text} ({seen[country_text]})'
+
+# Function to unwrap the {"data": ...} envelopes used by the sanctions map feed
+def unwrap_feed(value):
+    while isinstance(value, dict) and set(value) == {'data'}:
+        value = value['data']
+    return value
+
+# Function to turn the sanctions map feed into (entry, country, measure) rows. Every regime is a row of the
+# map, keyed like the rows read in the browser.
+def parse_feed(payload):
+    rows = []
+    seen = {}
+    for regime in unwrap_feed(payload) or []:
+        country = unwrap_feed(regime.get('country')) or {}
+        country_text = (country.get('title') if isinstance(country, dict) else country) or regime.get('title')
+        if not country_text:
+            continue
+
+        key = row_key(seen, country_text.strip())
+        for measure in unwrap_feed(regime.get('measures')) or []:
+            measure_type = unwrap_feed(measure.get('type')) or {}
+            measure_text = measure.get('description') or measure_type.get('title')
+            if measure_text:
+                rows.append((key, country_text.strip(), measure_text.strip()))
+    return rows
+
+# Scraping data from the data feed, no browser needed. Experimental: see SANCTIONSMAP_MODE.
+def scrape_data_from_feed(feed_url=SANCTIONSMAP_FEED_URL, session=None):
+    owns_session = session is None
+    if owns_session:
+        session = http_client.create_session(pool_size=1, retries=0)
+
+    try:
+        log_message('info', f'Fetching data feed {feed_url}...')
+        response = http_client.get(session, feed_url, headers={'Accept': 'application/json'})
+        response.raise_for_status()
+
+        rows = parse_feed(response.json())
+        log_message('info', f'Read {len(rows)} restrictive measures from the data feed.')
+        return build_measures_frame(rows)
+    finally:
+        if owns_session:
+            session.close()
+
+# Function to wait for the country list to load
+def load_main_page(driver, url=SANCTIONSMAP_URL):
+    driver.get(url)
+    log_message('info', f'Navigating to {url}...')
+
+    ul_elements = WebDriverWait(driver, 10).until(
+        EC.presence_of_all_elements_located((By.CLASS_NAME, 'filter-list'))
+    )
+    log_message('info', 'Elements loaded successfully.')
+    return ul_elements
+
+# Function to fingerprint the visible content of a row, ignoring whitespace
+def row_fingerprint(text):
+    return hashlib.sha256(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+# Function to read every row of the loaded page in one script call. Returns {row index: (key, country, fingerprint)},
+# keying each row by its country and numbering countries that have several rows.
+def read_row_fingerprints(driver):
+    plan = {}
+    seen = {}
+    for index, row in enumerate(driver.execute_script(ROW_CONTENT_SCRIPT) or []):
+        if not row:
+            continue
+        country_text, content = row
+        plan[index] = (row_key(seen, country_text), country_text, row_fingerprint(content))
+    return plan
+
+# Function to load the fingerprint and (country, measure) rows of every country from the latest snapshot
+# that has them. Returns {key: {'fingerprint': ..., 'rows': [...]}}, empty when there is none.
+def load_previous_rows(directory=snapshots.SNAPSHOT_DIR):
+    try:
+        for run_id in reversed(snapshots.list_runs(directory)):
+            if SANCTIONSMAP_ROWS_FRAME not in snapshots.read_manifest(run_id, directory)['frames']:
+                continue
+            previous = {}
+            for row in snapshots.open_snapshot(run_id, SANCTIONSMAP_ROWS_FRAME, directory).to_pylist():
+                entry = previous.setdefault(row['Key'], {'fingerprint': row['Fingerprint'], 'rows': []})
+                if row['Restrictive Measures'] is not None:
+                    entry['rows'].append((row['Country'], row['Restrictive Measures']))
+            log_message('info', f'Loaded the row fingerprints of {len(previous)} countries from snapshot {run_id}.')
+            return previous
+    except Exception as e:
+        log_message('error', f'Error loading the previous row fingerprints, reading every country: {e}')
+    return {}
+
+# Function to fingerprint every row of the loaded page and find the ones that are new or changed since
+# the previous crawl. Returns the rows by index and the indexes that have to be read.
+def plan_crawl(driver, previous):
+    plan = read_row_fingerprints(driver)
+    changed = {index for index, (key, _, fingerprint) in plan.items()
+               if key not in previous or previous[key]['fingerprint'] != fingerprint}
+    metrics.increment('countries_reused', len(plan) - len(changed))
+    log_message('info', f'{len(changed)} of {len(plan)} countries are new or changed; '
+                        f'reusing the last snapshot for the others.')
+    return plan, changed
 
-# Initialize WebDriver
-def init_driver():
+# Function to combine the rows read in the browser with the ones reused from the previous crawl, in page order.
+# A country that could not be read keeps its rows from the previous crawl with their old fingerprint, so it
+# stays in the output and the next run reads it again; it is listed in the failed countries of the crawl.
+def merge_rows(plan, changed, crawled, previous):
+    rows = []
+    records = []
+    failed = set()
+    for index, (key, country_text, fingerprint) in sorted(plan.items()):
+        if index in crawled:
+            country_rows = crawled[index]
+        elif index in changed:
+            failed.add(resolve(country_text) or country_text)
+            if key not in previous:
+                continue
+            country_rows = previous[key]['rows']
+            fingerprint = previous[key]['fingerprint']
+        else:
+            country_rows = previous[key]['rows']
+        rows.extend((key, country, measure) for country, measure in country_rows)
+        records.extend([key, country, fingerprint, measure] for country, measure in country_rows)
+        if not country_rows:
+            records.append([key, country_text, fingerprint, None])
+    return Crawl(build_measures_frame(rows), pd.DataFrame(records, columns=ROW_COLUMNS), failed)
+
+# Scraping data by clicking the popovers inside a single script call, opening only the popovers of
+# countries that are new or changed since the previous crawl
+def scrape_data_from_page(driver, url=SANCTIONSMAP_URL, previous=None):
+    previous = previous or {}
     try:
-        log_message('info', 'Initializing Chrome WebDriver...')
-        chrome_options = webdriver.ChromeOptions()
-        chrome_options.add_argument("--headless")  # Run in headless mode
-
-        service = Service(CHROME_DRIVER_PATH)
-        service.start()
-        
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        log_message('info', 'Chrome WebDriver initialized successfully.')
-        return driver
+        load_main_page(driver, url)
+        plan, changed = plan_crawl(driver, previous)
+        state = driver.execute_script(CLICK_POPOVERS_SCRIPT, sorted(changed)) if changed else []
+        # The script clicks every measure to read its popover
+        metrics.increment('popovers_clicked', len(state), mode='page')
+
+        # A country counts as read only when every popover it opened returned text; the others keep the
+        # rows of the previous crawl and are read again by the next run
+        crawled = {index: [] for index in changed}
+        failed = set()
+        for index, country, measure in state:
+            if measure:
+                crawled[index].append((country, measure))
+            else:
+                failed.add(index)
+        for index in sorted(failed):
+            log_message('error', f"A popover of {plan[index][1]} returned no text, keeping its last measures")
+            del crawled[index]
+        crawl = merge_rows(plan, changed, crawled, previous)
+        log_message('info', f'Read {len(crawl.measures)} restrictive measures in one script call.')
+        return crawl
     except Exception as e:
-        log_message('error', f'Error initializing WebDriver: {e}')
+        log_message('error', f'Error during the page script scraping: {e}')
         raise
 
-# Scraping data from the website
-def scrape_data(driver):
+# Function to click every measure popover of a country's row and return its (country, measure) rows.
+# Raises when a popover is missing or empty, so that a partly read country is not stored as done.
+def click_country_measures(driver, ul, country_text):
+    rows = []
+    restrictiveMeasure_element = ul.find_element(By.CSS_SELECTOR, 'li[data-heading="Restrictive measures"]')
+    child_li_elements = restrictiveMeasure_element.find_elements(By.TAG_NAME, 'li')
+
+    for index, li_ele in enumerate(child_li_elements):
+        div_element = li_ele.find_element(By.TAG_NAME, 'div')
+        div_element.click()
+        metrics.increment('popovers_clicked', mode='click')
+
+        try:
+            restrictiveMeasure_div_element = driver.find_element(By.CLASS_NAME, 'popover-content')
+        except NoSuchElementException:
+            log_message('error', f"Div with class 'popover-content' not found for country {country_text}")
+            raise
+        measure = restrictiveMeasure_div_element.text
+        if not measure:
+            raise ValueError(f'Popover {index + 1} of {country_text} returned no text')
+        rows.append((country_text, measure))
+    return rows
+
+# Scraping data from the website by clicking every measure popover of the countries that are new or changed
+# since the previous crawl. Each of them is an item of the crawl frontier: a country that fails is recorded
+# and skipped instead of losing the countries already read, and a resumed run only clicks the ones not done.
+def scrape_data_by_clicks(driver, url=SANCTIONSMAP_URL, frontier=None, previous=None):
+    frontier = frontier or crawl_frontier.default_frontier()
+    previous = previous or {}
     try:
-        url = 'https://www.sanctionsmap.eu/#/main'
-        driver.get(url)
-        log_message('info', f'Navigating to {url}...')
-
-        ul_elements = WebDriverWait(driver, 10).until(
-            EC.presence_of_all_elements_located((By.CLASS_NAME, 'filter-list'))
-        )
-        log_message('info', 'Elements loaded successfully.')
-
-        # Prepare DataFrame
-        columns_list = ["Country", "Restrictive Measures", "Executive Orders", "Type of Sanctions"]
-        main_df = pd.DataFrame(columns=columns_list)
-        main_df['Executive Orders'] = None
-        main_df['Type of Sanctions'] = None
-
-        # Scrape each country's data
-        for ul in ul_elements:
-            country_element = ul.find_element(By.CSS_SELECTOR, 'li[data-heading="Country or Category"] div a')
-            country_text = country_element.text
-
-            restrictiveMeasure_element = ul.find_element(By.CSS_SELECTOR, 'li[data-heading="Restrictive measures"]')
-            child_li_elements = restrictiveMeasure_element.find_elements(By.TAG_NAME, 'li')
-            
-            for index, li_ele in enumerate(child_li_elements):
-                div_element = li_ele.find_element(By.TAG_NAME, 'div')
-                div_element.click()
-
-                try:
-                    restrictiveMeasure_div_element = driver.find_element(By.CLASS_NAME, 'popover-content')
-                    Restrictive_measure_text = restrictiveMeasure_div_element.text
-                    
-                    row_object = {"Country": country_text, "Restrictive Measure": Restrictive_measure_text}
-                    main_df = pd.concat([main_df, pd.DataFrame([row_object])], ignore_index=True)
-
-                except NoSuchElementException:
-                    log_message('error', f"Div with class 'popover-content' not found for country {country_text}")
-
-        return main_df
+        ul_elements = load_main_page(driver, url)
+        plan, changed = plan_crawl(driver, previous)
+        frontier.add(SANCTIONSMAP_COUNTRIES_SOURCE, [(plan[index][0], plan[index][1]) for index in sorted(changed)])
+
+        crawled = {}
+
+        # Scrape the data of each new or changed country
+        for index, ul in enumerate(ul_elements):
+            if index not in changed:
+                continue
+            key, country_text, _ = plan[index]
+            try:
+                country_rows = frontier.fetch(SANCTIONSMAP_COUNTRIES_SOURCE, key,
+                                              lambda: click_country_measures(driver, ul, country_text),
+                                              label=country_text)
+                crawled[index] = [(country, measure) for country, measure in country_rows]
+            except Exception as e:
+                log_message('error', f'Error reading the measures of {country_text}: {e}')
+
+        return merge_rows(plan, changed, crawled, previous)
     except Exception as e:
         log_message('error', f'Error during data scraping: {e}')
         raise
 
-# Insert data into the Oracle database
-def insert_data_to_db(df):
+# Scraping data from the website with the browser, clicking the popovers in one script call before
+# falling back to clicking them one by one
+def scrape_data(driver, mode='page', url=SANCTIONSMAP_URL, frontier=None, previous=None):
+    if mode == 'page':
+        try:
+            crawl = scrape_data_from_page(driver, url, previous)
+            if not crawl.measures.empty:
+                return crawl
+            log_message('warning', 'Page script returned no measures, falling back to clicking each popover...')
+        except Exception as e:
+            log_message('error', f'Error reading the measures in one script call, falling back to clicking each popover: {e}')
+
+    return scrape_data_by_clicks(driver, url, frontier, previous)
+
+# Function to read the (entry, country, measure) rows of a frame, raising when there are none so that an
+# empty result is not stored as done
+def measure_rows(df):
+    if df.empty:
+        raise ValueError('No restrictive measures found')
+    return df[[ENTRY_COLUMN, "Country", "Restrictive Measures"]].values.tolist()
+
+# Scraping restrictive measures in the browser, or from the experimental data feed in 'feed' mode, falling
+# back to the browser when the feed cannot be read. When resuming, a feed read by an earlier run is reused.
+def scrape_restrictive_measures(mode=SANCTIONSMAP_MODE, frontier=None):
+    frontier = frontier or crawl_frontier.default_frontier()
+    if mode == 'feed':
+        try:
+            rows = frontier.fetch(SANCTIONSMAP_SOURCE, SANCTIONSMAP_FEED_URL,
+                                  lambda: measure_rows(scrape_data_from_feed()), label='sanctions map data feed')
+            return Crawl(build_measures_frame(rows), None, set())
+        except Exception as e:
+            log_message('error', f'Error reading the data feed, falling back to the browser: {e}')
+        mode = 'page'
+
+    # Countries whose row is unchanged since the last snapshot are not opened again
+    previous = load_previous_rows() if SANCTIONSMAP_FINGERPRINTS else {}
+
+    # Lease a warm session from the shared pool instead of starting a browser for this run
+    with driver_pool.default_pool().lease() as driver:
+        crawl = scrape_data(driver, mode, frontier=frontier, previous=previous)
+
+    # The browser replaced the feed, so the feed is not reported as missing
+    frontier.discard(SANCTIONSMAP_SOURCE, SANCTIONSMAP_FEED_URL)
+    if crawl.failed:
+        log_message('warning', f"Kept the last measures of {len(crawl.failed)} countries that could not be read: "
+                               f"{', '.join(sorted(crawl.failed))}")
+    return crawl
+
+# Function to compare two restrictive measures frames regardless of row order
+def compare_measures(left, right):
+    def normalize(df):
+        pairs = df[["Country", "Restrictive Measures"]].astype(str).apply(lambda col: col.str.strip())
+        # Number repeated rows so duplicates have to match one for one
+        pairs['Occurrence'] = pairs.groupby(["Country", "Restrictive Measures"]).cumcount()
+        return pairs
+
+    left, right = normalize(left), normalize(right)
+    merged = left.merge(right, how='outer', indicator=True)
+    return merged[merged['_merge'] != 'both']
+
+# Insert data into the Oracle database. Stored measures missing from the frame are deleted only for the
+# countries that were read in full, so a country whose popover failed keeps the measures stored for it.
+def insert_data_to_db(df, failed=()):
     try:
         if not df.empty:
             log_message('info', 'Inserting data into the database...')
-            engine = create_engine(f'oracle+cx_oracle://{DB_USERNAME}:{DB_PASSWORD}@{DB_DSN}?mode=SYSDBA', max_identifier_length=128)
-            df.to_sql('restrictive_measure', engine, index=False, if_exists='replace')
+            scope = {'Country': set(df['Country']) - set(failed)} if failed else None
+            # The entry only groups the measures for the consolidated sheet and is not stored
+            upsert_frame(df[MEASURE_COLUMNS], 'restrictive_measure', ['Country', 'Restrictive Measures'], delete_missing=True, scope=scope)
             log_message('info', 'Data inserted successfully into the database.')
         else:
             log_message('error', 'DataFrame is empty. No data to insert into the database.')
@@ -104,15 +396,20 @@ def insert_data_to_db(df):
         log_message('error', f'Error inserting data into the database: {e}')
         raise
 
+# Function to save the measures of a run as a snapshot, with the rows and fingerprints read in the browser
+# so the next run can skip unchanged countries
+def save_snapshot(crawl, run_id=None):
+    frames = {'restrictive_measures': crawl.measures}
+    if crawl.rows is not None:
+        frames[SANCTIONSMAP_ROWS_FRAME] = crawl.rows
+    return snapshots.save_snapshot(frames, run_id)
+
 # Main execution function
 def main():
-    try:
-        driver = init_driver()
-        main_df = scrape_data(driver)
-        insert_data_to_db(main_df)
-    finally:
-        log_message('debug', 'Closing WebDriver...')
-        driver.quit()
+    crawl = scrape_restrictive_measures()
+    crawl_frontier.default_frontier().report_missing()
+    insert_data_to_db(crawl.measures, crawl.failed)
+    save_snapshot(crawl)
 
 # Execute the main function
 if __name__ == "__main__":
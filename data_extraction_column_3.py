@@ -2,28 +2,35 @@ import os
 import requests
 import pandas as pd
 import urllib.request
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException
-from sqlalchemy import create_engine
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
 import logging
+from urllib.parse import urljoin
+import http_client
+import metrics
+import driver_pool
+import crawl_frontier
+import html_parsing
+from db_writer import upsert_frame
+from country_resolver import resolve_many
 
 # Load environment variables
 load_dotenv()
 
-# Retrieve credentials and paths from .env file
-DB_USERNAME = os.getenv('DB_USERNAME')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_DSN = os.getenv('DB_DSN')
-CHROME_DRIVER_PATH = os.getenv('CHROME_DRIVER_PATH')
+# Retrieve URLs from .env file
+OFAC_BASE_URL = os.getenv('OFAC_BASE_URL', 'https://ofac.treasury.gov')
+OFAC_PROGRAMS_URL = urljoin(OFAC_BASE_URL, '/sanctions-programs-and-country-information')
+OFAC_STATIC_MODE = os.getenv('OFAC_STATIC_MODE', 'true').lower() != 'false'
 
-# Setup logging configuration
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+# Crawl frontier sources of the program index and the program pages
+OFAC_INDEX_SOURCE = 'ofac_index'
+OFAC_PROGRAMS_SOURCE = 'ofac_programs'
+
+# Setup logging configuration, at LOG_LEVEL
+metrics.configure_logging()
 
 # Log function to standardize logging
 def log_message(level, message):
@@ -36,11 +43,68 @@ def log_message(level, message):
     else:
         logging.warning(message)
 
-# Function to scrape active sanction programs
-def scrape_active_sanction_programs(base_url):
-    driver = webdriver.Chrome(executable_path=CHROME_DRIVER_PATH)
+# Function to scrape active sanction programs. When resuming, the program list and the program
+# pages completed by an earlier run are read from the crawl frontier instead of being fetched.
+def scrape_active_sanction_programs(base_url, max_workers=http_client.MAX_WORKERS, static=None, frontier=None):
+    if static is None:
+        static = OFAC_STATIC_MODE
+    frontier = frontier or crawl_frontier.default_frontier()
+
+    session = http_client.create_session(pool_size=max_workers, retries=0)
+
+    try:
+        programs = frontier.fetch(OFAC_INDEX_SOURCE, base_url, lambda: scrape_program_links(base_url, session, static),
+                                  label='OFAC program index')
+        programs = [tuple(program) for program in programs]
+
+        # Every program is tracked, so the ones never reached are reported as missing too
+        frontier.add(OFAC_PROGRAMS_SOURCE, [(url, name) for name, url in programs])
+
+        return scrape_programs(programs, max_workers=max_workers, session=session, frontier=frontier)
+
+    except Exception as e:
+        log_message('error', f"Error in scrape_active_sanction_programs: {e}")
+        raise
+
+    finally:
+        session.close()
+
+# Function to read the (program name, link) pairs of the index page. Raises when none are found.
+def scrape_program_links(base_url, session, static):
+    programs = scrape_program_links_static(base_url, session) if static else []
+
+    # Fall back to a browser only when the server-rendered table is missing
+    if not programs:
+        if static:
+            log_message('warning', 'Program table not found in static HTML, falling back to Selenium...')
+        programs = scrape_program_links_selenium(base_url)
 
+    if not programs:
+        raise ValueError(f'No sanction programs found on {base_url}')
+    return programs
+
+# Function to read program links from the server-rendered index page without a browser
+def scrape_program_links_static(base_url, session):
     try:
+        log_message('info', f'Fetching {base_url} without a browser...')
+        response = http_client.get(session, base_url)
+        if response.status_code != 200:
+            log_message('error', f"Failed to retrieve {base_url} with status code {response.status_code}")
+            return []
+
+        soup = html_parsing.parse(response.text)
+        program_links = soup.select('table[class="table cols-2"] tr td:nth-of-type(1) > a')
+
+        return [(link.get_text(strip=True), urljoin(response.url or base_url, link.get('href')))
+                for link in program_links if link.get('href')]
+
+    except Exception as e:
+        log_message('error', f"Error in scrape_program_links_static: {e}")
+        return []
+
+# Function to read program links by rendering the index page in a session leased from the shared pool
+def scrape_program_links_selenium(base_url):
+    with driver_pool.default_pool().lease() as driver:
         log_message('info', f'Navigating to {base_url}...')
         driver.get(base_url)
 
@@ -48,82 +112,82 @@ def scrape_active_sanction_programs(base_url):
             EC.presence_of_all_elements_located((By.XPATH, '//table[@class="table cols-2"]//tbody//tr//td[1]/a'))
         )
 
-        data = []  # List to store data for DataFrame
-        log_message('info', 'Scraping program links...')
-        for link in program_links:
-            program_name = link.text
-            program_url = link.get_attribute("href")
-            log_message('debug', f"Scraping orders for {program_name} at {program_url}")
+        # Read every link up front so the session can go back to the pool before the program pages are fetched
+        return [(link.text, link.get_attribute("href")) for link in program_links]
 
-            # Call the modified scrape_executive_orders function
-            orders_data = scrape_executive_orders(program_url, program_name)
-            data.extend(orders_data)
+# Function to fetch every program page concurrently over one pooled session
+def scrape_programs(programs, max_workers=http_client.MAX_WORKERS, session=None, frontier=None):
+    owns_session = session is None
+    if owns_session:
+        session = http_client.create_session(pool_size=max_workers, retries=0)
+
+    try:
+        log_message('info', f'Scraping {len(programs)} program pages with {max_workers} workers...')
+        results = http_client.run_concurrent(
+            lambda program: scrape_executive_orders(program[1], program[0], session=session, frontier=frontier),
+            programs,
+            url_of=lambda program: program[1],
+            max_workers=max_workers,
+        )
+
+        data = []  # List to store data for DataFrame, kept in program link order
+        for orders_data in results:
+            # Key each row by country; programs covering several countries get a row per country
+            for program_name, order in orders_data:
+                for country in resolve_many(program_name) or [program_name]:
+                    data.append([country, order])
 
         # Create a DataFrame
         df = pd.DataFrame(data, columns=["Country", "Executive Orders"])
         log_message('info', 'Scraping complete. Returning the DataFrame...')
         return df
 
-    except Exception as e:
-        log_message('error', f"Error in scrape_active_sanction_programs: {e}")
-        raise
-
     finally:
-        driver.quit()
+        if owns_session:
+            session.close()
 
-# Function to scrape executive orders
-def scrape_executive_orders(url, program_name):
+# Function to scrape executive orders. Every attempt is recorded in the crawl frontier, so a page that
+# keeps failing is retried with backoff, reported as missing and fetched again by a resumed run.
+def scrape_executive_orders(url, program_name, session=None, frontier=None):
+    frontier = frontier or crawl_frontier.default_frontier()
     try:
-        log_message('info', f"Scraping executive orders from {url}...")
-        response = requests.get(url)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            heading = soup.find('h3', string=lambda text: text and 'Sanctions Brochures' in text)
-
-            orders_data = []  # List to store data for DataFrame
-            if heading:
-                ul_tag = heading.find_next('ul')
-
-                if ul_tag:
-                    a_tag = ul_tag.find('a')
-
-                    if a_tag:
-                        pdf_link = a_tag.get('href')
-                        full_url = 'https://ofac.treasury.gov' + pdf_link
-                        orders_data.append([program_name, full_url])
-                        log_message('info', f"Found brochure link for {program_name}: {full_url}")
-            
-            # Scrape executive orders if available
-            heading1 = soup.find('h4', string=lambda text: text and 'Executive Orders' in text)
-            if heading1:
-                ul_tag = heading1.find_next('ul')
-
-                if ul_tag:
-                    for li_tag in ul_tag.find_all('li'):
-                        a_tag = li_tag.find('a')
-                        if a_tag:
-                            pdf_link = a_tag.get('href')
-                            full_url = 'https://ofac.treasury.gov' + pdf_link
-                            order_title = li_tag.text.strip()
-                            orders_data.append([program_name, f"{order_title} {full_url}"])
-                            log_message('info', f"Found executive order for {program_name}: {order_title} {full_url}")
-
-            return orders_data
-        else:
-            log_message('error', f"Failed to retrieve {url} with status code {response.status_code}")
-            return []
-
+        return frontier.fetch(OFAC_PROGRAMS_SOURCE, url, lambda: read_executive_orders(url, program_name, session),
+                              label=program_name)
     except Exception as e:
         log_message('error', f"Error in scrape_executive_orders: {e}")
         return []
 
-# Function to insert data into the database
-def insert_data_to_db(df):
+# Function to read the brochure and executive order links of a program page. Raises when the page cannot be read.
+def read_executive_orders(url, program_name, session=None):
+    log_message('debug', f"Scraping executive orders from {url}...")
+    response = http_client.get(session or requests, url)
+    if response.status_code == 200:
+        # Only the headings and lists of the page are parsed, in one pass
+        brochure_link, executive_orders = html_parsing.parse_program_page(response.text)
+
+        orders_data = []  # List to store data for DataFrame
+        if brochure_link is not None:
+            full_url = urljoin(OFAC_BASE_URL, brochure_link)
+            orders_data.append([program_name, full_url])
+            log_message('debug', f"Found brochure link for {program_name}: {full_url}")
+
+        # Scrape executive orders if available
+        for order_title, pdf_link in executive_orders:
+            full_url = urljoin(OFAC_BASE_URL, pdf_link)
+            orders_data.append([program_name, f"{order_title} {full_url}"])
+            log_message('debug', f"Found executive order for {program_name}: {order_title} {full_url}")
+
+        return orders_data
+    else:
+        raise ValueError(f"Failed to retrieve {url} with status code {response.status_code}")
+
+# Function to insert data into the database. Stored rows missing from the frame are only deleted when
+# the frame is complete, so a page that failed to load does not remove the rows read by an earlier run.
+def insert_data_to_db(df, complete=False):
     try:
         if not df.empty:
             log_message('info', 'Inserting data into the database...')
-            engine = create_engine(f'oracle+cx_oracle://{DB_USERNAME}:{DB_PASSWORD}@{DB_DSN}?mode=SYSDBA', max_identifier_length=128)
-            df.to_sql('executive_orders', engine, index=False, if_exists='replace')
+            upsert_frame(df, 'executive_orders', ['Country', 'Executive Orders'], delete_missing=complete)
             log_message('info', 'Data inserted successfully into the database.')
         else:
             log_message('error', 'DataFrame is empty. No data to insert into the database.')
@@ -133,13 +197,14 @@ def insert_data_to_db(df):
 
 # Main execution function
 def main():
-    base_url = 'https://ofac.treasury.gov/sanctions-programs-and-country-information'
+    base_url = OFAC_PROGRAMS_URL
     try:
         # Scrape data from active sanction programs
         df = scrape_active_sanction_programs(base_url)
+        missing = crawl_frontier.default_frontier().report_missing()
         
-        # Insert data into Oracle DB
-        insert_data_to_db(df)
+        # Insert data into Oracle DB, deleting the rows of removed programs only when every page was read
+        insert_data_to_db(df, complete=not missing)
 
     except Exception as e:
         log_message('error', f"An error occurred during execution: {e}")
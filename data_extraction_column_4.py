@@ -1,28 +1,48 @@
 import os
-import requests
 import pandas as pd
 import pdfplumber
-from io import BytesIO
+import time
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin
 from dotenv import load_dotenv
-from selenium import webdriver
+from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from sqlalchemy import create_engine
+import http_client
+import metrics
+import driver_pool
+import crawl_frontier
+from streaming import Stage, run_stages
+from db_writer import upsert_frame
+from country_resolver import resolve
+from section_extractor import get_extractor
 
 # Load environment variables
 load_dotenv()
 
-# Retrieve credentials and paths from .env file
-DB_USERNAME = os.getenv('DB_USERNAME')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_DSN = os.getenv('DB_DSN')
-CHROME_DRIVER_PATH = os.getenv('CHROME_DRIVER_PATH')
+# Retrieve settings from .env file
+SCR_BASE_URL = os.getenv('SCR_BASE_URL', 'https://www.securitycouncilreport.org')
+SCR_FORECAST_URL = urljoin(SCR_BASE_URL, '/monthly-forecast/')
+SCR_STATIC_MODE = os.getenv('SCR_STATIC_MODE', 'true').lower() != 'false'
 
-# Setup logging configuration
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+# Concurrency of each stage of the fact sheet crawl
+ARTICLE_WORKERS = int(os.getenv('SCR_ARTICLE_WORKERS', 4))
+DOWNLOAD_WORKERS = int(os.getenv('SCR_DOWNLOAD_WORKERS', 4))
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', os.cpu_count() or 1))
+
+# Crawl frontier sources of the forecast index, the articles and the fact sheets
+SCR_INDEX_SOURCE = 'scr_index'
+SCR_ARTICLES_SOURCE = 'scr_articles'
+SCR_FACT_SHEETS_SOURCE = 'scr_fact_sheets'
+
+# Section of the fact sheets to extract
+start_keyword = 'Types of Sanctions'
+end_keywords = ['Number of Listed Individuals', 'Exemptions']
+
+# Setup logging configuration, at LOG_LEVEL
+metrics.configure_logging()
 
 # Log function to standardize logging
 def log_message(level, message):
@@ -37,107 +57,248 @@ def log_message(level, message):
 
 # Function to extract specific information from the text
 def extract_specific_information(text, start_keyword, end_keywords):
-    start_index = text.find(start_keyword)
-    
-    if start_index != -1:
-        # Find the end index for each keyword
-        end_indices = [text.find(keyword, start_index) for keyword in end_keywords if keyword != -1]
-        
-        # Extract the text between start and the minimum end index
-        min_end_index = min(end_index for end_index in end_indices if end_index != -1)
-        if min_end_index != -1:
-            return text[start_index + len(start_keyword):min_end_index]
-        else:
-            return text[start_index:]
-    
-    return None
+    return get_extractor(start_keyword, tuple(end_keywords)).extract(text)
+
+# Function to parse a downloaded fact sheet, extracting pages lazily and stopping at the end of the section.
+# Runs in a worker process, so it only takes and returns plain values.
+def parse_fact_sheet(pdf_path, country, start_keyword, end_keywords, remove_after=False):
+    started = time.perf_counter()
+    rows = []
+    stats = {'pages_parsed': 0}
+
+    def page_texts(pdf):
+        for page in pdf.pages:
+            # Extract text from the page
+            text = page.extract_text() or ''
+            stats['pages_parsed'] += 1
+            page.close()
+            yield text
 
-# Function to scrape content from the URL
-def scrape_content_from_url(fact_sheet_href, start_keyword, end_keywords):
     try:
-        # Set a user-agent in the headers to simulate a browser request
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
-        
-        # Download content from URL with headers
-        response = requests.get(fact_sheet_href, headers=headers)
-        response.raise_for_status()
-        
-        # Check the content type
-        content_type = response.headers.get('content-type', '').lower()
-        
-        if 'application/pdf' in content_type:
-            # Open the PDF from the downloaded content
-            with pdfplumber.open(BytesIO(response.content)) as pdf:
-                # Loop through all pages in the PDF
-                for page_number in range(len(pdf.pages)):
-                    page = pdf.pages[page_number]
-                    
-                    # Extract text from the page
-                    text = page.extract_text()
-                    
-                    # Extract specific information based on criteria
-                    specific_info = extract_specific_information(text, start_keyword, end_keywords)
-                    
-                    # If information is found, append it to the data list
-                    if specific_info:
-                        data_list.append({'Country': strong_text, 'Type of Sanctions': specific_info})
-        else:
-            log_message('warning', f"The content type '{content_type}' is not a PDF.")
-    
-    except Exception as e:
-        log_message('error', f"Error in scrape_content_from_url: {e}")
+        with pdfplumber.open(pdf_path) as pdf:
+            # The section may continue onto later pages; pages after its end marker are never read
+            section = get_extractor(start_keyword, tuple(end_keywords)).scan_pages(page_texts(pdf))
+            if section and section.text.strip():
+                rows.append({'Country': country, 'Type of Sanctions': section.text})
+    finally:
+        if remove_after:
+            os.remove(pdf_path)
+
+    stats['parse_seconds'] = time.perf_counter() - started
+    return rows, stats
+
+# Function to fetch a server-rendered page and parse it
+def fetch_soup(url, session):
+    response = http_client.get(session, url)
+    response.raise_for_status()
+    return BeautifulSoup(response.text, 'html.parser'), response.url or url
+
+# Function to yield (index, article link) for every article of the latest monthly forecast, without a browser
+def discover_articles(url, session):
+    log_message('info', f'Fetching {url} without a browser...')
+    soup, page_url = fetch_soup(url, session)
+
+    # Get the href from the first element
+    first_link = soup.select_one('#publication-stack > li:nth-of-type(1) > div > h4 > a')
+    if first_link is None or not first_link.get('href'):
+        log_message('error', f'No monthly forecast found on {url}')
+        return
+
+    # Access the link from href
+    soup, page_url = fetch_soup(urljoin(page_url, first_link['href']), session)
+
+    # Get href from all elements in the articles section
+    article_links = [link['href'] for link in soup.select('#articles > li > h4 > a') if link.get('href')]
+    log_message('info', f'Found {len(article_links)} articles.')
+    for index, article_link in enumerate(article_links):
+        yield index, urljoin(page_url, article_link)
 
-# Function to scrape the website and retrieve articles
-def scrape_security_council_reports():
-    url = "https://www.securitycouncilreport.org/monthly-forecast/"
-    driver = webdriver.Chrome(executable_path=CHROME_DRIVER_PATH)  # Provide path to chromedriver
+# Function to yield ((article index, highlight index), fact sheet link, country) for the fact sheets of an article
+def extract_fact_sheet_links(article, session):
+    index, article_link = article
+    soup, page_url = fetch_soup(article_link, session)
+
+    # Search for the fact sheet link
+    for position, highlight in enumerate(soup.select('#highlights > li')):
+        a_tag = highlight.find('a')
+        strong_tag = highlight.find('strong')
+        if "Fact Sheet on Sanctions" in highlight.get_text() and a_tag and a_tag.get('href') and strong_tag:
+            strong_text = strong_tag.get_text(strip=True)
+            yield (index, position), urljoin(page_url, a_tag['href']), resolve(strong_text) or strong_text
+
+# Function to read the article links of the latest monthly forecast in the browser
+def read_article_links(driver, url):
     driver.get(url)
 
+    # Get the href from the first element
+    first_link_element = driver.find_element(By.XPATH, '//*[@id="publication-stack"]/li[1]/div/h4/a')
+    first_link = first_link_element.get_attribute("href")
+
+    # Access the link from href
+    driver.get(first_link)
+
+    # Get href from all elements in the articles section
+    article_links_elements = driver.find_elements(By.XPATH, '//*[@id="articles"]/li/h4/a')
+    return [element.get_attribute("href") for element in article_links_elements]
+
+# Function to read the (fact sheet link, country) pairs of an article in the browser
+def read_fact_sheet_links(driver, article_link):
+    driver.get(article_link)
+
+    # Wait for the highlights to load
+    highlights_list = WebDriverWait(driver, 10).until(
+        EC.presence_of_all_elements_located((By.XPATH, '//*[@id="highlights"]/li'))
+    )
+
+    # Search for the fact sheet link
+    fact_sheets = []
+    for highlight in highlights_list:
+        li_text = highlight.text
+        a_tag = highlight.find_element(By.TAG_NAME, 'a')
+        if "Fact Sheet on Sanctions" in li_text:
+            fact_sheet_href = a_tag.get_attribute('href')
+            strong_text = highlight.find_element(By.TAG_NAME, 'strong').text
+            fact_sheets.append((fact_sheet_href, resolve(strong_text) or strong_text))
+    return fact_sheets
+
+# Function to yield (index, article link) for every article, read in a session leased from the browser pool
+def discover_articles_browser(url):
+    with driver_pool.default_pool().lease() as driver:
+        article_links = read_article_links(driver, url)
+    yield from enumerate(article_links)
+
+# Function to yield the fact sheets of an article in the same shape as extract_fact_sheet_links, using the browser pool
+def extract_fact_sheet_links_browser(article):
+    index, article_link = article
+    with driver_pool.default_pool().lease() as driver:
+        fact_sheets = read_fact_sheet_links(driver, article_link)
+    for position, (fact_sheet_href, country) in enumerate(fact_sheets):
+        yield (index, position), fact_sheet_href, country
+
+# Function to yield (index, article link) for every article, read once per run through the crawl frontier.
+# When resuming, the article list of an earlier run is reused and nothing is fetched.
+def discover_tracked_articles(discover, url, frontier):
+    def read_articles():
+        articles = list(discover(url))
+        if not articles:
+            raise ValueError(f'No articles found on {url}')
+        return articles
+
+    articles = [tuple(article) for article in
+                frontier.fetch(SCR_INDEX_SOURCE, url, read_articles, label='monthly forecast')]
+    frontier.add(SCR_ARTICLES_SOURCE, [(article_link, None) for _, article_link in articles])
+    yield from articles
+
+# Function to return the fact sheets of an article through the crawl frontier, registering each of them
+# so the ones that never get parsed are reported as missing
+def read_tracked_fact_sheet_links(article, read_links, frontier):
+    fact_sheets = frontier.fetch(SCR_ARTICLES_SOURCE, article[1], lambda: list(read_links(article)))
+    fact_sheets = [(tuple(key), fact_sheet_href, country) for key, fact_sheet_href, country in fact_sheets]
+    frontier.add(SCR_FACT_SHEETS_SOURCE, [(fact_sheet_href, country) for _, fact_sheet_href, country in fact_sheets])
+    return fact_sheets
+
+# Function to stream a fact sheet to disk. Yields (key, link, country, path, bytes read, temporary)
+# when it is a PDF and nothing otherwise. A fact sheet parsed by a run being resumed is not downloaded;
+# it is passed on with no path and the extract stage reuses its stored rows.
+def download_fact_sheet(fact_sheet, session, frontier):
+    key, fact_sheet_href, country = fact_sheet
+    if frontier.completed(SCR_FACT_SHEETS_SOURCE, fact_sheet_href) is not None:
+        yield key, fact_sheet_href, country, None, 0, False
+        return
+
+    # Stream the download to disk instead of holding it in memory
+    pdf_path, content_type, bytes_read, temporary = frontier.attempt(
+        SCR_FACT_SHEETS_SOURCE, fact_sheet_href, lambda: http_client.download(session, fact_sheet_href), label=country)
+
+    # Check the content type
+    content_type = content_type.lower()
+
+    if 'application/pdf' in content_type:
+        yield key, fact_sheet_href, country, pdf_path, bytes_read, temporary
+    else:
+        log_message('warning', f"The content type '{content_type}' of {fact_sheet_href} is not a PDF.")
+        frontier.fail(SCR_FACT_SHEETS_SOURCE, fact_sheet_href, f"content type '{content_type}' is not a PDF", country)
+        if temporary:
+            os.remove(pdf_path)
+
+# Function to extract the section of a downloaded fact sheet in the process pool. Yields (key, record) pairs.
+def extract_section(download, executor, frontier):
+    key, fact_sheet_href, country, pdf_path, bytes_read, temporary = download
+    if pdf_path is None:
+        rows = frontier.get(SCR_FACT_SHEETS_SOURCE, fact_sheet_href)['result']
+    else:
+        future = executor.submit(parse_fact_sheet, pdf_path, country, start_keyword, end_keywords, temporary)
+        rows = collect_fact_sheet(fact_sheet_href, country, bytes_read, future, frontier)
+    for row in rows:
+        yield key, row
+
+# Function to wait for a fact sheet parse, report what it cost and record the rows in the crawl frontier
+def collect_fact_sheet(fact_sheet_href, country, bytes_read, future, frontier):
     try:
-        # Get the href from the first element
-        first_link_element = driver.find_element(By.XPATH, '//*[@id="publication-stack"]/li[1]/div/h4/a')
-        first_link = first_link_element.get_attribute("href")
-        
-        # Access the link from href
-        driver.get(first_link)
-        
-        # Get href from all elements in the articles section
-        article_links_elements = driver.find_elements(By.XPATH, '//*[@id="articles"]/li/h4/a')
-        article_links = [element.get_attribute("href") for element in article_links_elements]
-        
-        # Process each article link
-        for article_link in article_links:
-            driver.get(article_link)
-            
-            # Wait for the highlights to load
-            highlights_list = WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located((By.XPATH, '//*[@id="highlights"]/li'))
-            )
-            
-            # Search for the fact sheet link
-            fact_sheet_found = False
-            for highlight in highlights_list:
-                li_text = highlight.text
-                a_tag = highlight.find_element(By.TAG_NAME, 'a')
-                a_text = a_tag.text
-                if "Fact Sheet on Sanctions" in li_text:
-                    fact_sheet_found = True
-                    fact_sheet_href = a_tag.get_attribute('href')
-                    strong_text = highlight.find_element(By.TAG_NAME, 'strong').text
-                    scrape_content_from_url(fact_sheet_href, start_keyword, end_keywords)
-                    
+        rows, stats = future.result()
+        metrics.increment('pdfs_parsed')
+        metrics.increment('pdf_pages_parsed', stats['pages_parsed'])
+        metrics.observe('pdf_parse_seconds', stats['parse_seconds'])
+        log_message('debug', f"Parsed {fact_sheet_href}: {stats['pages_parsed']} pages, {bytes_read} bytes read, "
+                            f"{stats['parse_seconds']:.2f}s")
+        frontier.complete(SCR_FACT_SHEETS_SOURCE, fact_sheet_href, rows, country)
+        return rows
     except Exception as e:
-        log_message('error', f"Error in scrape_security_council_reports: {e}")
+        metrics.increment('pdf_parse_errors')
+        frontier.fail(SCR_FACT_SHEETS_SOURCE, fact_sheet_href, e, country)
+        log_message('error', f"Error parsing {fact_sheet_href}: {e}")
+        return []
+
+# Function to crawl the fact sheets as a pipeline of stages connected by bounded queues:
+# article discovery, fact sheet link extraction, PDF download and section extraction.
+# Each stage has its own number of workers; yields (key, record) pairs as sections are extracted,
+# where key gives the crawl order of the record. Every article and fact sheet is tracked in the crawl
+# frontier; when resuming, only the ones that are not done are fetched.
+def stream_fact_sheets(url=SCR_FORECAST_URL, static=None, max_workers=PDF_WORKERS,
+                       article_workers=ARTICLE_WORKERS, download_workers=DOWNLOAD_WORKERS, frontier=None):
+    if static is None:
+        static = SCR_STATIC_MODE
+    frontier = frontier or crawl_frontier.default_frontier()
+
+    session = http_client.create_session(pool_size=article_workers + download_workers, retries=0)
+
+    try:
+        # Article pages are server-rendered; the browser is only used when static mode is off
+        if static:
+            discover = lambda url: discover_articles(url, session)
+            read_links = lambda article: extract_fact_sheet_links(article, session)
+        else:
+            discover = discover_articles_browser
+            read_links = extract_fact_sheet_links_browser
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            yield from run_stages(discover_tracked_articles(discover, url, frontier), [
+                Stage('fact_sheet_links', lambda article: read_tracked_fact_sheet_links(article, read_links, frontier),
+                      article_workers),
+                Stage('download', lambda fact_sheet: download_fact_sheet(fact_sheet, session, frontier), download_workers),
+                # One thread per worker process keeps every process busy
+                Stage('extract', lambda download: extract_section(download, executor, frontier), max_workers),
+            ])
+
     finally:
-        driver.quit()
+        session.close()
+
+# Function to scrape the types of sanctions from the fact sheets, returned in crawl order
+def scrape_security_council_reports(max_workers=PDF_WORKERS, url=SCR_FORECAST_URL, static=None, frontier=None):
+    try:
+        records = sorted(stream_fact_sheets(url, static, max_workers, frontier=frontier), key=lambda pair: pair[0])
+        return [record for _, record in records]
+    except Exception as e:
+        log_message('error', f"Error in scrape_security_council_reports: {e}")
+        return []
 
-# Function to insert data into the database
-def insert_data_to_db(df):
+# Function to insert data into the database. Stored rows missing from the frame are only deleted when
+# the frame is complete, so a page that failed to load does not remove the rows read by an earlier run.
+def insert_data_to_db(df, complete=False):
     try:
         if not df.empty:
             log_message('info', 'Inserting data into the database...')
-            engine = create_engine(f'oracle+cx_oracle://{DB_USERNAME}:{DB_PASSWORD}@{DB_DSN}?mode=SYSDBA', max_identifier_length=128)
-            df.to_sql('type_of_sanctions', engine, index=False, if_exists='replace')
+            upsert_frame(df, 'type_of_sanctions', ['Country'], delete_missing=complete)
             log_message('info', 'Data inserted successfully into the database.')
         else:
             log_message('error', 'DataFrame is empty. No data to insert into the database.')
@@ -148,17 +309,17 @@ def insert_data_to_db(df):
 # Main execution function
 def main():
     columns_list = ["Country", "Type of Sanctions"]
-    security_council_report_df = pd.DataFrame(columns=columns_list)
     
     try:
         # Scrape data from security council reports
-        scrape_security_council_reports()
+        data_list = scrape_security_council_reports()
+        missing = crawl_frontier.default_frontier().report_missing()
         
         # Create DataFrame from the data list
-        security_council_report_df = pd.DataFrame(data_list)
+        security_council_report_df = pd.DataFrame(data_list, columns=columns_list)
         
-        # Insert data into Oracle DB
-        insert_data_to_db(security_council_report_df)
+        # Insert data into Oracle DB, deleting the rows of removed fact sheets only when every one was read
+        insert_data_to_db(security_council_report_df, complete=not missing)
         
     except Exception as e:
         log_message('error', f"An error occurred during execution: {e}")
@@ -0,0 +1,332 @@
+import os
+import hashlib
+import threading
+import logging
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import create_engine, inspect, select, bindparam, text, MetaData, Table, Column, String, Text, Integer, Float
+from dotenv import load_dotenv
+import metrics
+
+# Load environment variables
+load_dotenv()
+
+# Retrieve credentials from environment variables
+DB_USERNAME = os.getenv('DB_USERNAME')
+DB_PASSWORD = os.getenv('DB_PASSWORD')
+DB_DSN = os.getenv('DB_DSN')
+
+# Optional SQLAlchemy URL that replaces the Oracle connection, e.g. sqlite:///abl_data.db
+DB_URL = os.getenv('DB_URL')
+
+# Number of rows bound per executemany round trip
+BATCH_SIZE = int(os.getenv('DB_BATCH_SIZE', 1000))
+
+# Oracle accepts at most 1000 expressions in an IN list
+DELETE_BATCH_SIZE = 500
+
+# Longest VARCHAR2 in bytes; longer text is stored as CLOB
+VARCHAR_LIMIT = 4000
+
+# Name of the column a column is copied to while its type is changed
+SWAP_COLUMN = 'abl_swap_column'
+
+# Row keys and hashes are 64-bit hashes written as 16 hex digits; stored keys of another length were
+# written by an older version and are replaced like rows without a key
+ROW_KEY_LENGTH = 16
+
+# Log function to standardize logging
+def log_message(level, message):
+    if level == 'info':
+        logging.info(message)
+    elif level == 'debug':
+        logging.debug(message)
+    elif level == 'error':
+        logging.error(message)
+    else:
+        logging.warning(message)
+
+# Function to build the database URL
+def database_url():
+    return DB_URL or f'oracle+cx_oracle://{DB_USERNAME}:{DB_PASSWORD}@{DB_DSN}?mode=SYSDBA'
+
+# One pooled engine per process, created on first use
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            url = database_url()
+            options = {'max_identifier_length': 128, 'pool_pre_ping': True}
+            if not url.startswith('sqlite'):
+                options.update(pool_size=5, max_overflow=5, pool_recycle=3600)
+            _engine = create_engine(url, **options)
+        return _engine
+
+# Function to hash every column of a frame once, one 64-bit hash per value. Missing values hash differently
+# from empty strings.
+def hash_columns(df):
+    return pd.DataFrame({name: pd.util.hash_pandas_object(series, index=False, categorize=False).to_numpy()
+                         for name, series in df.items()})
+
+# Function to combine the hashes of the given columns into one 64-bit hash per row
+def hash_rows(hashes, columns):
+    return pd.util.hash_pandas_object(hashes[columns], index=False, categorize=False).to_numpy()
+
+# Function to write 64-bit hashes as hex digits without formatting them one by one
+def hex_digests(hashes):
+    digits = np.asarray(hashes, dtype='>u8').tobytes().hex().encode('ascii')
+    return np.frombuffer(digits, dtype=f'S{ROW_KEY_LENGTH}').astype(str).astype(object)
+
+# Function to compute the row keys written by the first version of the writer, SHA-1 digests of the key
+# columns and occurrence; only used to replace the rows stored under them
+def sha1_row_keys(df, key_columns):
+    def sha1_rows(frame, columns):
+        values = frame[columns].astype(object).where(frame[columns].notna(), '').astype(str)
+        joined = values[columns[0]].str.cat([values[column] for column in columns[1:]], sep='\x1f')
+        return joined.map(lambda text: hashlib.sha1(text.encode('utf-8')).hexdigest())
+
+    key_hash = sha1_rows(df.reset_index(drop=True), key_columns)
+    occurrence = key_hash.groupby(key_hash).cumcount().astype(str)
+    return sha1_rows(pd.DataFrame({'key': key_hash, 'occurrence': occurrence}), ['key', 'occurrence'])
+
+# Function to add a row key (hash of the key columns plus an occurrence number for repeated keys)
+# and a content hash (hash of every column) to a frame
+def with_row_keys(df, key_columns):
+    df = df.reset_index(drop=True)
+    keyed = pd.DataFrame(index=df.index)
+    # Every column is hashed once; the key and content hashes combine the column hashes
+    hashes = hash_columns(df)
+    hashes['row_key'] = hash_rows(hashes, key_columns)
+    hashes['row_occurrence'] = hashes.groupby('row_key').cumcount()
+    keyed['row_key'] = hex_digests(hash_rows(hashes, ['row_key', 'row_occurrence']))
+    keyed['row_hash'] = hex_digests(hash_rows(hashes, list(df.columns)))
+    return keyed
+
+# Function to pick a column type for every column of a frame. Text that fits in a VARCHAR2 gets
+# an explicit size, rounded up to a power of two so small changes do not resize the column;
+# only text longer than VARCHAR_LIMIT bytes is stored as CLOB.
+def column_types(df):
+    types = {}
+    for name in df.columns:
+        series = df[name]
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+            types[name] = Integer()
+            continue
+        if pd.api.types.is_float_dtype(series):
+            types[name] = Float()
+            continue
+
+        # UTF-8 lengths are measured by Arrow rather than by encoding every value in Python
+        values = series.dropna()
+        if not values.empty and not pd.api.types.is_string_dtype(values):
+            values = values.astype(str)
+        longest = pc.max(pc.binary_length(pa.array(values, type=pa.large_string()))).as_py() or 0
+        if longest > VARCHAR_LIMIT:
+            types[name] = Text()
+        else:
+            size = 32
+            while size < longest:
+                size *= 2
+            types[name] = String(min(size, VARCHAR_LIMIT))
+    return types
+
+# Function to describe the table for a frame. Columns get positional keys (c0, c1, ...) so that
+# bind parameter names never contain the spaces used in column names such as 'Restrictive Measures'.
+def build_table(table_name, df, keyed=True):
+    types = column_types(df)
+    columns = [Column('row_key', String(40), primary_key=True), Column('row_hash', String(40), nullable=False)] if keyed else []
+    columns += [Column(name, types[name], key=f'c{i}') for i, name in enumerate(df.columns)]
+    return Table(table_name, MetaData(), *columns)
+
+# Function to check whether a stored column has to change type to hold the values of the frame.
+# Columns only ever grow: CLOB holds any text and a text column holds numbers.
+def needs_type_change(current, desired):
+    if isinstance(current, Text):
+        return False
+    if isinstance(desired, Text):
+        return True
+    if isinstance(desired, String):
+        return not isinstance(current, String) or (current.length is not None and current.length < desired.length)
+    return isinstance(desired, Float) and isinstance(current, Integer)
+
+# Function to build the ADD clause of an ALTER TABLE statement for the dialect
+def add_column_clause(conn, name, column_type):
+    definition = f'{conn.dialect.identifier_preparer.quote(name)} {column_type.compile(dialect=conn.dialect)}'
+    return f'ADD ({definition})' if conn.dialect.name == 'oracle' else f'ADD COLUMN {definition}'
+
+# Function to add the columns of the table that are not stored yet. They are added as nullable columns,
+# including the row key and hash of tables left behind by the old drop-and-replace loads.
+def add_missing_columns(conn, table, existing):
+    preparer = conn.dialect.identifier_preparer
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        log_message('info', f'Adding column {table.name}.{column.name}...')
+        conn.execute(text(f'ALTER TABLE {preparer.format_table(table)} {add_column_clause(conn, column.name, column.type)}'))
+
+# Function to change the type of a stored column by adding a column of the new type, copying the values
+# into it, dropping the old column and renaming the new one. Oracle cannot MODIFY a VARCHAR2 into a CLOB,
+# so this is how text that outgrows VARCHAR2 is moved to CLOB without rebuilding the table.
+def swap_column(conn, table, column):
+    preparer = conn.dialect.identifier_preparer
+    table_name = preparer.format_table(table)
+    name = preparer.quote(column.name)
+    swap = preparer.quote(SWAP_COLUMN)
+
+    log_message('info', f'Changing {table.name}.{column.name} to {column.type.compile(dialect=conn.dialect)}...')
+    try:
+        conn.execute(text(f'ALTER TABLE {table_name} {add_column_clause(conn, SWAP_COLUMN, column.type)}'))
+        conn.execute(text(f'UPDATE {table_name} SET {swap} = {name}'))
+        conn.execute(text(f'ALTER TABLE {table_name} DROP COLUMN {name}'))
+        conn.execute(text(f'ALTER TABLE {table_name} RENAME COLUMN {swap} TO {name}'))
+    except Exception as e:
+        raise RuntimeError(f'Could not change {table.name}.{column.name} in place; if {SWAP_COLUMN} exists, '
+                           f'it holds a copy of the values: {e}') from e
+
+# Function to change stored columns in place to types that hold the new data. VARCHAR2 columns are
+# widened on Oracle; other changes, such as VARCHAR2 to CLOB, swap the column for one of the new type.
+# A live table is never dropped to make it fit.
+def migrate_columns(conn, table, existing):
+    # SQLite does not enforce column types or VARCHAR lengths
+    if conn.dialect.name == 'sqlite':
+        return
+
+    preparer = conn.dialect.identifier_preparer
+    for column in table.columns:
+        current = existing.get(column.name)
+        if current is None or not needs_type_change(current, column.type):
+            continue
+
+        if (conn.dialect.name == 'oracle' and isinstance(current, String) and isinstance(column.type, String)
+                and not isinstance(column.type, Text)):
+            log_message('info', f'Widening {table.name}.{column.name} to VARCHAR2({column.type.length})...')
+            conn.execute(text(f'ALTER TABLE {preparer.format_table(table)} '
+                              f'MODIFY ({preparer.quote(column.name)} VARCHAR2({column.type.length} CHAR))'))
+            continue
+
+        swap_column(conn, table, column)
+
+# Function to create the table, or bring an existing one up to the columns of the frame without dropping it:
+# missing columns are added and too narrow columns are changed in place
+def ensure_table(conn, table, df):
+    inspector = inspect(conn)
+    if not inspector.has_table(table.name):
+        table.create(conn)
+        return
+
+    existing = {column['name']: column['type'] for column in inspector.get_columns(table.name)}
+    add_missing_columns(conn, table, existing)
+    migrate_columns(conn, table, existing)
+
+# Function to convert the columns of a frame to lists of Python values, with None for missing values
+def column_values(df):
+    return [series.astype(object).where(series.notna(), None).tolist() for _, series in df.items()]
+
+# Function to execute a statement over the rows of columnar values, binding batch_size rows per executemany
+# call. keys name the bind parameter of every column; rows are only built one batch at a time.
+def execute_batches(conn, statement, keys, columns, batch_size=BATCH_SIZE):
+    count = len(columns[0]) if columns else 0
+    for start in range(0, count, batch_size):
+        batch = zip(*(column[start:start + batch_size] for column in columns))
+        conn.execute(statement, [dict(zip(keys, row)) for row in batch])
+
+# Function to replace the contents of a table with a frame in one transaction, inserting the rows
+# with array-bound executemany calls of batch_size rows
+def bulk_load(df, table_name, engine=None, batch_size=BATCH_SIZE):
+    engine = engine or get_engine()
+    started = time.perf_counter()
+    df = df.reset_index(drop=True)
+    table = build_table(table_name, df, keyed=False)
+
+    keys = [f'c{i}' for i in range(len(df.columns))]
+
+    with engine.begin() as conn:
+        ensure_table(conn, table, df)
+        conn.execute(table.delete())
+        execute_batches(conn, table.insert(), keys, column_values(df), batch_size)
+
+    metrics.increment('rows_written', len(df), table=table_name, operation='loaded')
+    metrics.observe('db_write_seconds', time.perf_counter() - started, table=table_name)
+    log_message('info', f'{table_name}: {len(df)} rows loaded.')
+    return len(df)
+
+# Function to delete the rows with the given row keys, in batches that fit an IN list
+def delete_row_keys(conn, table, row_keys):
+    for start in range(0, len(row_keys), DELETE_BATCH_SIZE):
+        conn.execute(table.delete().where(table.c.row_key.in_(row_keys[start:start + DELETE_BATCH_SIZE])))
+
+# Function to find the column of a table by its name rather than its positional key
+def table_column(table, name):
+    return next(column for column in table.columns if column.name == name)
+
+# Function to write a frame incrementally: rows are diffed against the stored row keys and hashes and
+# only inserted, changed or deleted rows are written, in one transaction, so readers never see an empty table.
+# Stored rows missing from the frame are only deleted with delete_missing, which a caller passes when the frame
+# is complete; a scrape that partly failed then leaves the rows it could not read as they were. scope maps column
+# names to values and limits the deletes to the stored rows holding those values, e.g. the countries read in full.
+def upsert_frame(df, table_name, key_columns, engine=None, batch_size=BATCH_SIZE, delete_missing=False, scope=None):
+    engine = engine or get_engine()
+    started = time.perf_counter()
+    df = df.reset_index(drop=True)
+    keyed = with_row_keys(df, key_columns)
+    table = build_table(table_name, df)
+    # The frame stays columnar: rows are only built one executemany batch at a time
+    frame = pd.concat([keyed, df], axis=1)
+    keys = ['row_key', 'row_hash'] + [f'c{i}' for i in range(len(df.columns))]
+    row_keys = keyed['row_key'].to_numpy()
+
+    with engine.begin() as conn:
+        ensure_table(conn, table, df)
+        scope = {name: set(values) for name, values in (scope or {}).items()}
+        scope_columns = [table_column(table, name) for name in scope]
+        rows = conn.execute(select(table.c.row_key, table.c.row_hash, *scope_columns)).fetchall()
+        stored = {row[0]: row[1] for row in rows if row[0] is not None}
+
+        # Only stored rows inside the scope may be deleted
+        deletable = [row[0] for row in rows
+                     if all(value in values for value, values in zip(row[2:], scope.values()))] if delete_missing else []
+
+        # Rows loaded before the table had row keys are replaced by the keyed rows, under the same rule
+        legacy = sum(1 for row_key in deletable if row_key is None)
+        if legacy:
+            condition = table.c.row_key.is_(None)
+            for column, values in zip(scope_columns, scope.values()):
+                condition = condition & column.in_(list(values))
+            conn.execute(table.delete().where(condition))
+
+        # Rows of the frame stored under the keys of an older version of the writer are replaced by the same rows
+        outdated = {row_key for row_key in stored if len(row_key) != ROW_KEY_LENGTH}
+        replaced = list(outdated & set(sha1_row_keys(df, key_columns))) if outdated else []
+        delete_row_keys(conn, table, replaced)
+
+        # Position of every row's key among the stored keys, -1 when it is not stored; -1 picks the trailing None
+        position = pd.Index(list(stored)).get_indexer(row_keys)
+        stored_hashes = np.array(list(stored.values()) + [None], dtype=object)
+        is_stored = position >= 0
+        is_changed = is_stored & (stored_hashes[position] != keyed['row_hash'].to_numpy())
+
+        deleted = list(set(row_key for row_key in deletable if row_key is not None) - set(row_keys) - set(replaced))
+        delete_row_keys(conn, table, deleted)
+
+        if is_changed.any():
+            update = table.update().where(table.c.row_key == bindparam('b_row_key')).values(
+                {column: bindparam(f'b_{column.key}') for column in table.columns if column.key != 'row_key'})
+            execute_batches(conn, update, [f'b_{key}' for key in keys], column_values(frame[is_changed]), batch_size)
+
+        if not is_stored.all():
+            execute_batches(conn, table.insert(), keys, column_values(frame[~is_stored]), batch_size)
+
+    counts = {'inserted': int((~is_stored).sum()), 'updated': int(is_changed.sum()),
+              'deleted': len(deleted) + len(replaced) + legacy}
+    for operation, count in counts.items():
+        metrics.increment('rows_written', count, table=table_name, operation=operation)
+    metrics.observe('db_write_seconds', time.perf_counter() - started, table=table_name)
+    log_message('info', f"{table_name}: {counts['inserted']} inserted, {counts['updated']} updated, "
+                        f"{counts['deleted']} deleted, {len(df) - counts['inserted'] - counts['updated']} unchanged.")
+    return counts
@@ -0,0 +1,203 @@
+import os
+import queue
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Retrieve browser settings from environment variables
+CHROME_DRIVER_PATH = os.getenv('CHROME_DRIVER_PATH')
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', 3))
+BROWSER_MAX_PAGES = int(os.getenv('BROWSER_MAX_PAGES', 50))
+BROWSER_BLOCK_RESOURCES = os.getenv('BROWSER_BLOCK_RESOURCES', 'true').lower() != 'false'
+
+# URL patterns the browser does not load: images, stylesheets and fonts are never read by the scrapers
+BLOCKED_URL_PATTERNS = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+                        '*.css', '*.woff', '*.woff2', '*.ttf']
+
+# Log function to standardize logging
+def log_message(level, message):
+    if level == 'info':
+        logging.info(message)
+    elif level == 'debug':
+        logging.debug(message)
+    elif level == 'error':
+        logging.error(message)
+    else:
+        logging.warning(message)
+
+# Function to build the options of a headless Chrome session, with images and stylesheets
+# disabled in the profile when resources are blocked
+def chrome_options(block_resources=BROWSER_BLOCK_RESOURCES):
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless")  # Run in headless mode
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    if block_resources:
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.managed_default_content_settings.stylesheets': 2,
+            'profile.managed_default_content_settings.fonts': 2,
+        })
+    return options
+
+# Function to start a headless Chrome session. Resources are also blocked at the network level,
+# which covers stylesheets and fonts that the profile settings let through.
+def create_chrome_driver(block_resources=BROWSER_BLOCK_RESOURCES):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    log_message('info', 'Initializing Chrome WebDriver...')
+    service = Service(CHROME_DRIVER_PATH) if CHROME_DRIVER_PATH else Service()
+    driver = webdriver.Chrome(service=service, options=chrome_options(block_resources))
+
+    if block_resources:
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            log_message('warning', f'Could not block resources at the network level: {e}')
+
+    log_message('info', 'Chrome WebDriver initialized successfully.')
+    return driver
+
+# Driver leased from a pool. Attribute access goes to the underlying driver; page loads are counted
+# so the pool can recycle the session, and quit() is left to the pool.
+class PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+    def get(self, url):
+        self.pages += 1
+        return self.driver.get(url)
+
+    def quit(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+# Pool of warm browser sessions. Each lease holds one session exclusively, so work leased in
+# parallel runs on separate sessions; a session is replaced after max_pages page loads to limit
+# the memory a long-lived browser accumulates, or when the work on it fails.
+class DriverPool:
+    def __init__(self, size=BROWSER_POOL_SIZE, max_pages=BROWSER_MAX_PAGES, driver_factory=create_chrome_driver):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.driver_factory = driver_factory
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(self.size)
+        self.lock = threading.Lock()
+        self.sessions = set()
+        self.closed = False
+
+    # Function to start sessions up front so the first leases do not wait for a browser to start
+    def warm(self, count=None):
+        count = self.size if count is None else min(count, self.size)
+        with self.lock:
+            missing = count - len(self.sessions)
+        for _ in range(missing):
+            self.release(self.start_session())
+        return self
+
+    # Function to start a new session and track it
+    def start_session(self):
+        session = PooledDriver(self.driver_factory())
+        with self.lock:
+            self.sessions.add(session)
+        return session
+
+    # Function to quit a session and stop tracking it
+    def retire(self, session):
+        with self.lock:
+            self.sessions.discard(session)
+        try:
+            session.driver.quit()
+        except Exception as e:
+            log_message('warning', f'Error closing WebDriver: {e}')
+
+    # Function to return a session to the idle queue, or retire it once it has loaded max_pages pages
+    def release(self, session):
+        if self.closed or (self.max_pages and session.pages >= self.max_pages):
+            log_message('debug', f'Recycling WebDriver after {session.pages} pages...')
+            self.retire(session)
+        else:
+            self.idle.put(session)
+
+    # Function to lease a session for the duration of a with block. Blocks while every session
+    # is leased; a session whose work raised is discarded rather than reused.
+    @contextmanager
+    def lease(self):
+        if self.closed:
+            raise RuntimeError('Driver pool is closed')
+
+        with self.slots:
+            try:
+                session = self.idle.get_nowait()
+            except queue.Empty:
+                session = self.start_session()
+
+            try:
+                yield session
+            except BaseException:
+                self.retire(session)
+                raise
+            self.release(session)
+
+    # Function to run func(driver, item) for every item on up to size leased sessions in parallel.
+    # Results are returned in the same order as items.
+    def map(self, func, items, max_workers=None):
+        items = list(items)
+
+        def call(item):
+            with self.lease() as driver:
+                return func(driver, item)
+
+        workers = min(max_workers or self.size, self.size, len(items))
+        if workers <= 1:
+            return [call(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(call, items))
+
+    # Function to quit every idle session; leased sessions are quit when they are returned
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                self.retire(self.idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Pool shared by every scraper in the process, created on first use and closed at exit
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+def default_pool():
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None or _default_pool.closed:
+            _default_pool = DriverPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
+
+# Function to close the shared pool, if it was started
+def close_default_pool():
+    with _default_pool_lock:
+        if _default_pool is not None:
+            _default_pool.close()
@@ -0,0 +1,167 @@
+import re
+import logging
+from copy import copy
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.hyperlink import Hyperlink
+
+# Sheet names of the exported workbook
+SHEET_NAME = 'ABL Data'
+LINKS_SHEET_NAME = 'Links'
+
+# Excel refuses cells longer than this many characters
+CELL_LIMIT = 32767
+
+# Font color of link cells, the one of Excel's Hyperlink style
+LINK_COLOR = '0563C1'
+
+# Column widths, in characters, of the consolidated sheet and the links sheet
+COLUMN_WIDTHS = {'Country': 28, 'Restrictive Measures': 80, 'Executive Orders': 80, 'Type of Sanctions': 80}
+LINK_COLUMN_WIDTHS = [28, 22, 70, 80]
+
+# URLs inside cell text, such as the OFAC executive order and brochure links
+URL_PATTERN = re.compile(r'https?://[^\s<>"]+')
+
+# Bullets the consolidation puts in front of every entry
+BULLETS = '•●'
+
+# Log function to standardize logging
+def log_message(level, message):
+    if level == 'info':
+        logging.info(message)
+    elif level == 'debug':
+        logging.debug(message)
+    elif level == 'error':
+        logging.error(message)
+    else:
+        logging.warning(message)
+
+# Function to find the (title, url) pairs of a cell. The title is the text before the URL on its line.
+def find_links(text):
+    links = []
+    for line in str(text).splitlines():
+        start = 0
+        for match in URL_PATTERN.finditer(line):
+            title = line[start:match.start()].strip().strip(BULLETS).strip()
+            links.append((title, match.group().rstrip('.,;)')))
+            start = match.end()
+    return links
+
+# Writes a consolidated sheet in write-only mode: cell values go straight to disk as rows are appended,
+# so memory does not grow with the size of the cells. Links are native hyperlinks, which openpyxl keeps in
+# memory until the workbook is saved, so memory grows with the number of links: a cell with one link points
+# at its URL, and a cell with several points at its rows on the Links sheet, where each URL has its own cell.
+class StreamingWorkbook:
+    def __init__(self, columns, sheet_name=SHEET_NAME, links_sheet_name=LINKS_SHEET_NAME):
+        self.columns = list(columns)
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(sheet_name)
+        self.links = self.workbook.create_sheet(links_sheet_name)
+        self.links_sheet_name = links_sheet_name
+        self.bold = Font(bold=True)
+        # Assigning a style to a cell looks it up in the workbook's style tables, which costs more than
+        # writing the cell; the styles are looked up once and copied to every cell
+        wrap = Alignment(wrap_text=True, vertical='top')
+        link_font = Font(color=LINK_COLOR, underline='single')
+        self.wrap_style = self.style_of(alignment=wrap)
+        self.link_style = self.style_of(font=link_font)
+        self.wrapped_link_style = self.style_of(alignment=wrap, font=link_font)
+        self.rows_written = 0
+        self.links_written = 0
+        self.truncated = 0
+
+        # Column widths have to be set before the first row is written
+        for index, name in enumerate(self.columns):
+            self.sheet.column_dimensions[get_column_letter(index + 1)].width = COLUMN_WIDTHS.get(name, 40)
+        for index, width in enumerate(LINK_COLUMN_WIDTHS):
+            self.links.column_dimensions[get_column_letter(index + 1)].width = width
+
+        self.sheet.append([self.header_cell(self.sheet, name) for name in self.columns])
+        self.links.append([self.header_cell(self.links, name) for name in ('Country', 'Column', 'Title', 'URL')])
+
+    # Function to look up the style ids of the given cell styles once
+    def style_of(self, **styles):
+        cell = WriteOnlyCell(self.sheet)
+        for name, value in styles.items():
+            setattr(cell, name, value)
+        return cell._style
+
+    # Function to build a cell with a style from style_of
+    def styled_cell(self, sheet, value, style):
+        cell = WriteOnlyCell(sheet, value=value)
+        cell._style = copy(style)
+        return cell
+
+    # Function to build a bold header cell
+    def header_cell(self, sheet, name):
+        cell = WriteOnlyCell(sheet, value=name)
+        cell.font = self.bold
+        return cell
+
+    # Function to clean up a cell value, truncating text Excel would refuse
+    def cell_value(self, value):
+        if value is None or value != value:
+            return None
+        if isinstance(value, str) and len(value) > CELL_LIMIT:
+            self.truncated += 1
+            value = value[:CELL_LIMIT]
+        return value
+
+    # Function to build a linked cell showing value
+    def link_cell(self, sheet, value, link, wrap=False):
+        cell = self.styled_cell(sheet, value, self.wrapped_link_style if wrap else self.link_style)
+        cell.hyperlink = link
+        return cell
+
+    # Function to write the links of a cell to the Links sheet and return the row of the first one
+    def write_links(self, country, column, links):
+        first_row = self.links_written + 2
+        for title, url in links:
+            self.links.append([country, column, title, self.link_cell(self.links, url, url)])
+            self.links_written += 1
+        return first_row
+
+    # Function to build the cell of a value: plain values are passed as they are, multi-line text is wrapped
+    # and text with links is linked
+    def value_cell(self, country, column, value):
+        value = self.cell_value(value)
+        if not isinstance(value, str):
+            return value
+
+        wrap = '\n' in value
+        links = find_links(value) if '://' in value else []
+        if len(links) == 1:
+            return self.link_cell(self.sheet, value, links[0][1], wrap)
+        if links:
+            first_row = self.write_links(country, column, links)
+            link = Hyperlink(ref='', location=f"'{self.links_sheet_name}'!D{first_row}", tooltip=f'{len(links)} links')
+            return self.link_cell(self.sheet, value, link, wrap)
+        # Plain values need no cell object
+        return self.styled_cell(self.sheet, value, self.wrap_style) if wrap else value
+
+    # Function to append one row of values, in the order of the columns
+    def append(self, values):
+        country = values[0]
+        self.sheet.append([self.value_cell(country, column, value) for column, value in zip(self.columns, values)])
+        self.rows_written += 1
+
+    # Function to write the workbook to path; the workbook cannot be appended to afterwards
+    def save(self, path):
+        self.workbook.save(path)
+        if self.truncated:
+            log_message('warning', f'{self.truncated} cells were longer than {CELL_LIMIT} characters and were truncated.')
+        log_message('info', f'Wrote {self.rows_written} rows and {self.links_written} links to {path}.')
+
+# Function to write rows with the given columns to a workbook at path, streaming them to disk
+def export_rows(rows, columns, path):
+    workbook = StreamingWorkbook(columns)
+    for values in rows:
+        workbook.append(list(values))
+    workbook.save(path)
+    return workbook.rows_written
+
+# Function to write a DataFrame to a workbook at path, streaming one row at a time
+def export_frame(df, path):
+    return export_rows(df.itertuples(index=False, name=None), df.columns, path)
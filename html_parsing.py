@@ -0,0 +1,71 @@
+import os
+import importlib.util
+from bs4 import BeautifulSoup, SoupStrainer
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Parser used by BeautifulSoup: 'auto' picks the C-backed lxml parser when it is installed and
+# the built-in html.parser otherwise. Any parser BeautifulSoup knows can be named instead.
+HTML_PARSER = os.getenv('HTML_PARSER', 'auto')
+
+# Headings that introduce the links of an OFAC program page, and the tags the page is parsed down to.
+# Every other element (navigation, scripts, footer) is skipped by the parser and never becomes a tag.
+BROCHURES_HEADING = ('h3', 'Sanctions Brochures')
+EXECUTIVE_ORDERS_HEADING = ('h4', 'Executive Orders')
+PROGRAM_PAGE_STRAINER = SoupStrainer(['h3', 'h4', 'ul'])
+
+# Function to resolve the parser to use
+def parser_name(parser=HTML_PARSER):
+    if parser != 'auto':
+        return parser
+    return 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+
+# Function to parse HTML, keeping only the elements matched by parse_only when it is given
+def parse(html, parser=HTML_PARSER, parse_only=None):
+    return BeautifulSoup(html, parser_name(parser), parse_only=parse_only)
+
+# Function to check whether a tag is the given heading, matching the text the way soup.find(string=...) does
+def is_heading(tag, heading):
+    name, text = heading
+    return tag.name == name and tag.string is not None and text in tag.string
+
+# Function to read the brochure link and the executive order links of an OFAC program page in a single
+# traversal of the headings and lists. Returns (brochure href or None, [(order title, href), ...]),
+# with the hrefs as they appear on the page.
+def parse_program_page(html, parser=HTML_PARSER):
+    soup = parse(html, parser, PROGRAM_PAGE_STRAINER)
+
+    brochure = None
+    orders = []
+    # Headings found so far whose list has not been reached yet, and the ones already handled
+    waiting = []
+    handled = set()
+
+    for tag in soup.find_all(['h3', 'h4', 'ul']):
+        if tag.name != 'ul':
+            for heading in (BROCHURES_HEADING, EXECUTIVE_ORDERS_HEADING):
+                # Only the first matching heading counts
+                if heading not in handled and heading not in waiting and is_heading(tag, heading):
+                    waiting.append(heading)
+            continue
+
+        # The first list after a heading holds its links
+        for heading in waiting:
+            if heading == BROCHURES_HEADING:
+                a_tag = tag.find('a')
+                if a_tag:
+                    brochure = a_tag.get('href')
+            else:
+                for li_tag in tag.find_all('li'):
+                    a_tag = li_tag.find('a')
+                    if a_tag:
+                        orders.append((li_tag.text.strip(), a_tag.get('href')))
+            handled.add(heading)
+        waiting = []
+
+        if len(handled) == 2:
+            break
+
+    return brochure, orders
@@ -0,0 +1,254 @@
+import os
+import time
+import uuid
+import shutil
+import hashlib
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Retrieve cache settings from environment variables
+HTTP_CACHE_DIR = os.getenv('HTTP_CACHE_DIR', '.http_cache')
+HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+
+# Cache mode: 'revalidate' sends conditional requests, 'offline' replays from the cache
+# without touching the network and 'off' bypasses the cache. Read when a request is made, so
+# changing HTTP_CACHE_MODE takes effect without re-importing the module.
+DEFAULT_CACHE_MODE = 'revalidate'
+
+# Function to resolve the cache mode of a request: the given mode, or HTTP_CACHE_MODE as it is now
+def cache_mode(mode=None):
+    return mode or os.getenv('HTTP_CACHE_MODE', DEFAULT_CACHE_MODE)
+
+# Raised in offline mode when a URL has never been cached
+class CacheMiss(requests.exceptions.ConnectionError):
+    pass
+
+# On-disk response cache. Bodies are stored once per SHA-256 digest and an SQLite index maps
+# each URL to its body and validators. The least recently used entries are evicted past max_bytes,
+# except the one being returned. Downloads hand out pinned links to the bodies, which eviction cannot remove.
+class ResponseCache:
+    def __init__(self, directory=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'pinned'), exist_ok=True)
+
+        with self.connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                content_type TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL)''')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+
+    @contextmanager
+    def connect(self):
+        conn = sqlite3.connect(os.path.join(self.directory, 'index.sqlite'), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def object_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[:2], digest)
+
+    # Function to look up the cached entry for a URL
+    def lookup(self, url):
+        with self.lock, self.connect() as conn:
+            return self.find_entry(conn, url)
+
+    # Function to read the entry of a URL on a connection, or None when it or its body is gone
+    def find_entry(self, conn, url):
+        row = conn.execute('SELECT digest, size, content_type, etag, last_modified FROM entries WHERE url = ?',
+                           (url,)).fetchone()
+        if row is None or not os.path.exists(self.object_path(row[0])):
+            return None
+        return dict(zip(('digest', 'size', 'content_type', 'etag', 'last_modified'), row))
+
+    # Function to link a body to a new path under pinned/, or copy it where hard links are not supported.
+    # Eviction only removes the object's own name, so the pinned file stays readable until the caller removes it.
+    # Called with the lock held, so the body cannot be evicted while it is being linked.
+    def pin_object(self, digest):
+        path = os.path.join(self.directory, 'pinned', f'{uuid.uuid4().hex}-{digest[:16]}')
+        try:
+            os.link(self.object_path(digest), path)
+        except OSError:
+            shutil.copyfile(self.object_path(digest), path)
+        return path
+
+    # Function to mark the entry of a URL as used and return it with a pinned path to its body,
+    # or (None, None) when it has been evicted
+    def pin(self, url):
+        with self.lock, self.connect() as conn:
+            entry = self.find_entry(conn, url)
+            if entry is None:
+                return None, None
+            self.touch(conn, url)
+            return entry, self.pin_object(entry['digest'])
+
+    # Function to mark an entry as recently used, on a connection taken with the lock held
+    def touch(self, conn, url):
+        conn.execute('UPDATE entries SET last_access = ? WHERE url = ?', (time.time(), url))
+
+    # Function to write a body into the object store and return its digest and size
+    def write_object(self, chunks):
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=os.path.join(self.directory, 'objects'))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+
+            digest = digest.hexdigest()
+            path = self.object_path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+            return digest, size
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    # Function to store a response body for a URL, streaming it in chunks. Returns the entry, and a pinned
+    # path to the body when pin is set. The new entry is never evicted by its own store, even when it is
+    # larger than max_bytes; it goes with the next store.
+    def store(self, url, headers, chunks, pin=False):
+        digest, size = self.write_object(chunks)
+        now = time.time()
+        with self.lock, self.connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                         (url, digest, size, headers.get('Content-Type'), headers.get('ETag'),
+                          headers.get('Last-Modified'), now, now))
+            self.evict(conn, keep=url)
+            entry = dict(digest=digest, size=size, content_type=headers.get('Content-Type'),
+                         etag=headers.get('ETag'), last_modified=headers.get('Last-Modified'))
+            return entry, (self.pin_object(digest) if pin else None)
+
+    # Function to evict least recently used entries, other than the one of keep, until the cache fits
+    # in max_bytes. Called with the lock held.
+    def evict(self, conn, keep=None):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for url, digest, size in conn.execute('SELECT url, digest, size FROM entries WHERE url != ? ORDER BY last_access',
+                                              (keep,)).fetchall():
+            conn.execute('DELETE FROM entries WHERE url = ?', (url,))
+            # Bodies are shared by digest, so only remove the file once nothing points at it
+            if conn.execute('SELECT 1 FROM entries WHERE digest = ?', (digest,)).fetchone() is None:
+                path = self.object_path(digest)
+                if os.path.exists(path):
+                    os.remove(path)
+                total -= size
+            if total <= self.max_bytes:
+                break
+
+    # Function to build a requests.Response from the cached entry of a URL, or None when it has been evicted.
+    # The body is read with the lock held, so it cannot be evicted halfway.
+    def response(self, url):
+        with self.lock, self.connect() as conn:
+            entry = self.find_entry(conn, url)
+            if entry is None:
+                return None
+            self.touch(conn, url)
+            with open(self.object_path(entry['digest']), 'rb') as f:
+                content = f.read()
+
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict({'Content-Type': entry['content_type'] or '',
+                                                'Content-Length': str(entry['size'])})
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = content
+        response.from_cache = True
+        return response
+
+    # Function to add the validators of a cached entry to the headers of a request
+    def conditional_headers(self, entry, headers):
+        headers = dict(headers or {})
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    # Function to GET a URL, revalidating a cached copy with ETag/Last-Modified when one exists.
+    # mode defaults to HTTP_CACHE_MODE as it is when the request is made.
+    def get(self, session, url, mode=None, **kwargs):
+        mode = cache_mode(mode)
+        if mode == 'offline':
+            response = self.response(url)
+            if response is None:
+                raise CacheMiss(f'{url} is not in the HTTP cache')
+            return response
+
+        request_headers = kwargs.pop('headers', None)
+        entry = self.lookup(url)
+        response = session.get(url, headers=self.conditional_headers(entry, request_headers), **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            cached = self.response(url)
+            if cached is not None:
+                return cached
+            # Evicted since it was revalidated: fetch it again without validators
+            response = session.get(url, headers=request_headers, **kwargs)
+
+        if response.status_code == 200:
+            self.store(url, response.headers, [response.content])
+            response.from_cache = False
+        return response
+
+    # Function to stream a URL to the object store and return a pinned path to the body and its entry,
+    # so large bodies such as PDFs never have to be held in memory. The pinned file belongs to the caller,
+    # who removes it when done; eviction cannot remove it in the meantime. entry['from_cache'] tells
+    # whether the body was served from the cache. mode defaults to HTTP_CACHE_MODE as it is when called.
+    def download(self, session, url, mode=None, chunk_size=64 * 1024, **kwargs):
+        mode = cache_mode(mode)
+        if mode == 'offline':
+            entry, path = self.pin(url)
+            if entry is None:
+                raise CacheMiss(f'{url} is not in the HTTP cache')
+            return path, dict(entry, from_cache=True)
+
+        request_headers = kwargs.pop('headers', None)
+        entry = self.lookup(url)
+        with session.get(url, headers=self.conditional_headers(entry, request_headers), stream=True, **kwargs) as response:
+            if response.status_code == 304 and entry is not None:
+                entry, path = self.pin(url)
+                if entry is not None:
+                    return path, dict(entry, from_cache=True)
+            else:
+                response.raise_for_status()
+                entry, path = self.store(url, response.headers, response.iter_content(chunk_size=chunk_size), pin=True)
+                return path, dict(entry, from_cache=False)
+
+        # Evicted since it was revalidated: fetch it again without validators
+        return self.download(session, url, mode, chunk_size, headers=request_headers, **kwargs)
+
+# Shared cache used by all scrapers, created on first use
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
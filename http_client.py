@@ -0,0 +1,123 @@
+import os
+import time
+import threading
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import http_cache
+import metrics
+
+# Retrieve HTTP settings from environment variables
+REQUEST_TIMEOUT = float(os.getenv('REQUEST_TIMEOUT', 30))
+MAX_WORKERS = int(os.getenv('MAX_WORKERS', 8))
+MAX_PER_HOST = int(os.getenv('MAX_PER_HOST', 4))
+
+# User-agent sent with every request to simulate a browser request
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+
+# Host slot held by the calling thread while run_concurrent runs one of its items
+_host_slot = threading.local()
+
+# Function to create a session with a shared, keep-alive connection pool. Sessions whose fetches are
+# retried by the crawl frontier pass retries=0, so the two layers of retries do not multiply.
+def create_session(pool_size=MAX_WORKERS, retries=2):
+    session = requests.Session()
+    session.headers.update({'User-Agent': USER_AGENT})
+
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504],
+                  allowed_methods=['GET', 'HEAD']) if retries else 0
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+# Function to count a fetched page and record its latency per host
+def record_fetch(url, started, size, from_cache):
+    host = urlparse(url).netloc
+    source = 'cache' if from_cache else 'network'
+    metrics.increment('pages_fetched', host=host, source=source)
+    metrics.increment('bytes_downloaded', size, host=host, source=source)
+    metrics.observe('http_request_seconds', time.perf_counter() - started, host=host)
+
+# Function to GET a URL through the session with a timeout, going through the shared
+# HTTP cache unless HTTP_CACHE_MODE is 'off'
+def get(session, url, timeout=REQUEST_TIMEOUT, use_cache=True, **kwargs):
+    started = time.perf_counter()
+    if use_cache and http_cache.cache_mode() != 'off':
+        response = http_cache.default_cache().get(session, url, timeout=timeout, **kwargs)
+    else:
+        response = session.get(url, timeout=timeout, **kwargs)
+    record_fetch(url, started, len(response.content), getattr(response, 'from_cache', False))
+    return response
+
+# Function to stream a URL to disk. Returns the file path, content type, size and whether the
+# file is a temporary copy that the caller has to remove: a pinned link into the cache, or a
+# temporary file when the cache is off.
+def download(session, url, timeout=REQUEST_TIMEOUT, use_cache=True, chunk_size=64 * 1024, **kwargs):
+    started = time.perf_counter()
+    if use_cache and http_cache.cache_mode() != 'off':
+        path, entry = http_cache.default_cache().download(session, url, timeout=timeout,
+                                                          chunk_size=chunk_size, **kwargs)
+        record_fetch(url, started, entry['size'], entry.get('from_cache', False))
+        return path, (entry['content_type'] or ''), entry['size'], True
+
+    with session.get(url, timeout=timeout, stream=True, **kwargs) as response:
+        response.raise_for_status()
+        size = 0
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            try:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    size += len(chunk)
+                    f.write(chunk)
+            except BaseException:
+                f.close()
+                os.remove(f.name)
+                raise
+        record_fetch(url, started, size, False)
+        return f.name, response.headers.get('content-type', ''), size, True
+
+# Function to sleep without holding the host slot of the calling thread, so a backoff does not keep
+# the other items of the same host waiting. Outside run_concurrent it just sleeps.
+def sleep(seconds):
+    slot = getattr(_host_slot, 'semaphore', None)
+    if slot is None:
+        time.sleep(seconds)
+        return
+    slot.release()
+    try:
+        time.sleep(seconds)
+    finally:
+        slot.acquire()
+
+# Function to run func over items on a bounded thread pool, capping concurrent calls per host.
+# A call gives up its host slot while it sleeps in sleep(). Results are returned in the same order
+# as items, whatever order the calls finish in.
+def run_concurrent(func, items, url_of, max_workers=MAX_WORKERS, max_per_host=MAX_PER_HOST):
+    items = list(items)
+    host_limits = {}
+    host_limits_lock = threading.Lock()
+
+    def host_limit(url):
+        host = urlparse(url).netloc
+        with host_limits_lock:
+            if host not in host_limits:
+                host_limits[host] = threading.BoundedSemaphore(max_per_host)
+            return host_limits[host]
+
+    def call(item):
+        slot = host_limit(url_of(item))
+        with slot:
+            outer, _host_slot.semaphore = getattr(_host_slot, 'semaphore', None), slot
+            try:
+                return func(item)
+            finally:
+                _host_slot.semaphore = outer
+
+    if max_workers <= 1 or len(items) <= 1:
+        return [call(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(call, items))
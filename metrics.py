@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Log level of every script, e.g. DEBUG for one line per page fetched
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+# Directory the run reports are written to when a run does not pass one
+METRICS_DIR = os.getenv('METRICS_DIR', 'metrics')
+
+# Prefix of the exported Prometheus metric names
+METRIC_PREFIX = 'abl_'
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Function to configure logging once for every script, at LOG_LEVEL
+def configure_logging(level=LOG_LEVEL):
+    logging.basicConfig(level=getattr(logging, str(level).upper(), logging.INFO),
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Function to build the key of a metric series from its name and labels
+def series_key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+# Collects counters, latency histograms and spans for one run. Safe to use from many threads.
+class Metrics:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self.spans = []
+
+    # Function to add value to a counter
+    def increment(self, name, value=1, **labels):
+        key = series_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    # Function to record one observation, in seconds, in a latency histogram
+    def observe(self, name, seconds, **labels):
+        key = series_key(name, labels)
+        index = bisect_left(self.buckets, seconds)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            histogram['counts'][index] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    # Function to time the body of a with block into a latency histogram
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    # Function to time a phase of the run. The span is kept for the run report and its duration
+    # is also observed in the span_seconds histogram.
+    @contextmanager
+    def span(self, name, **labels):
+        started_at = time.time()
+        started = time.perf_counter()
+        status = 'ok'
+        try:
+            yield
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            self.observe('span_seconds', seconds, span=name)
+            with self.lock:
+                self.spans.append({'name': name, 'labels': {key: str(value) for key, value in labels.items()},
+                                   'started_at': started_at, 'seconds': seconds, 'status': status})
+
+    # Function to return everything collected so far as plain values
+    def report(self, run_id=None):
+        with self.lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = [{'name': name, 'labels': dict(labels), 'count': histogram['count'], 'sum': histogram['sum'],
+                           'buckets': dict(zip([str(bound) for bound in self.buckets] + ['+Inf'], histogram['counts']))}
+                          for (name, labels), histogram in sorted(self.histograms.items())]
+            spans = sorted(self.spans, key=lambda span: span['started_at'])
+        return {'run_id': run_id, 'started_at': self.started_at, 'finished_at': time.time(),
+                'counters': counters, 'histograms': histograms, 'spans': spans}
+
+    # Function to render the counters and histograms in the Prometheus text format
+    def prometheus(self):
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f'{METRIC_PREFIX}{name}_total'
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{format_labels(labels)} {value}')
+
+        for (name, labels), histogram in histograms:
+            metric = f'{METRIC_PREFIX}{name}'
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f'# TYPE {metric} histogram')
+            cumulative = 0
+            for bound, count in zip([str(bound) for bound in self.buckets] + ['+Inf'], histogram['counts']):
+                cumulative += count
+                lines.append(f'{metric}_bucket{format_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{metric}_sum{format_labels(labels)} {histogram["sum"]}')
+            lines.append(f'{metric}_count{format_labels(labels)} {histogram["count"]}')
+
+        return '\n'.join(lines) + '\n'
+
+    # Function to write the JSON run report and the Prometheus text file to directory.
+    # Returns the two paths.
+    def write_reports(self, directory=METRICS_DIR, run_id=None):
+        run_id = run_id or time.strftime('%Y%m%dT%H%M%S', time.localtime(self.started_at))
+        os.makedirs(directory, exist_ok=True)
+        json_path = os.path.join(directory, f'run-{run_id}.json')
+        prometheus_path = os.path.join(directory, 'abl_scraper.prom')
+
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(run_id), f, indent=2)
+
+        # Written next to the final path and renamed, so a scraper never reads a partial file
+        with open(prometheus_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        os.replace(prometheus_path + '.tmp', prometheus_path)
+
+        logging.info(f'Wrote run metrics to {json_path} and {prometheus_path}.')
+        return json_path, prometheus_path
+
+# Function to render labels in the Prometheus text format
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+# Metrics of the current process, shared by every module
+_default_metrics = Metrics()
+
+def default_metrics():
+    return _default_metrics
+
+# Function to add value to a counter of the shared metrics
+def increment(name, value=1, **labels):
+    _default_metrics.increment(name, value, **labels)
+
+# Function to record an observation in a histogram of the shared metrics
+def observe(name, seconds, **labels):
+    _default_metrics.observe(name, seconds, **labels)
+
+# Function to time a with block into a histogram of the shared metrics
+def timer(name, **labels):
+    return _default_metrics.timer(name, **labels)
+
+# Function to time a phase of the run in the shared metrics
+def span(name, **labels):
+    return _default_metrics.span(name, **labels)
@@ -0,0 +1,159 @@
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import pandas as pd
+from dotenv import load_dotenv
+
+import data_extraction_column_1 as column_1
+import data_extraction_column_2 as column_2
+import data_extraction_column_3 as column_3
+import data_extraction_column_4 as column_4
+import consolidation
+import country_resolver
+import driver_pool
+import metrics
+import excel_export
+import snapshots
+import crawl_frontier
+from db_writer import bulk_load
+
+# Load environment variables
+load_dotenv()
+
+# Setup logging configuration, at LOG_LEVEL
+metrics.configure_logging()
+
+# Table the consolidated data is written to
+TABLE_NAME = 'abl_data'
+
+# Log function to standardize logging
+def log_message(level, message):
+    if level == 'info':
+        logging.info(message)
+    elif level == 'debug':
+        logging.debug(message)
+    elif level == 'error':
+        logging.error(message)
+    else:
+        logging.warning(message)
+
+# Function to run a dependency graph of stages. stages maps a name to (function, dependencies);
+# each function is called with the results of its dependencies as keyword arguments as soon as
+# they are available, so independent stages run at the same time.
+def run_graph(stages, max_workers=None):
+    results = {}
+    running = {}
+    pending = dict(stages)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages)) as executor:
+        while pending or running:
+            for name, (func, dependencies) in list(pending.items()):
+                if all(dependency in results for dependency in dependencies):
+                    del pending[name]
+                    log_message('info', f'Starting stage {name}...')
+                    kwargs = {dependency: results[dependency] for dependency in dependencies}
+                    running[executor.submit(timed_stage, name, func, kwargs)] = name
+
+            if not running:
+                raise ValueError(f"Stages {', '.join(pending)} have missing or circular dependencies")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    # Stop scheduling; stages that already started are left to finish
+                    log_message('error', f'Stage {name} failed: {e}')
+                    for other in running:
+                        other.cancel()
+                    raise
+
+    return results
+
+# Function to run one stage in a metrics span and log how long it took
+def timed_stage(name, func, kwargs):
+    started = time.perf_counter()
+    with metrics.span(name):
+        result = func(**kwargs)
+    log_message('info', f'Stage {name} finished in {time.perf_counter() - started:.1f}s.')
+    return result
+
+# Function to scrape the types of sanctions into a DataFrame
+def scrape_type_of_sanctions():
+    return pd.DataFrame(column_4.scrape_security_council_reports(), columns=["Country", "Type of Sanctions"])
+
+# Function to consolidate the sources and report the names that did not match a country
+def consolidate_sources(countries, restrictive_measures, executive_orders, type_of_sanctions):
+    final = consolidation.consolidate(restrictive_measures, executive_orders, type_of_sanctions, countries)
+    country_resolver.report_unmatched()
+    return final
+
+# Function to write the consolidated data to the database and the workbook
+def write_outputs(final, output_path, write_db=True):
+    if final.empty:
+        log_message('error', 'Consolidated DataFrame is empty. Nothing to write.')
+        return
+
+    if write_db:
+        bulk_load(final, TABLE_NAME)
+    # Streamed to disk row by row, with hyperlinks for the OFAC links
+    excel_export.export_frame(final, output_path)
+    log_message('info', f'Wrote {len(final)} countries to {output_path}.')
+
+# Function to save the source frames and the consolidated frame of the run as a snapshot, with the
+# sanctions map rows and fingerprints when the browser read them, so the next run can skip unchanged countries
+def save_snapshot(run_id, sanctions_map, executive_orders, type_of_sanctions, final):
+    frames = {'restrictive_measures': sanctions_map.measures, 'executive_orders': executive_orders,
+              'type_of_sanctions': type_of_sanctions, 'final': final}
+    if sanctions_map.rows is not None:
+        frames[column_2.SANCTIONSMAP_ROWS_FRAME] = sanctions_map.rows
+    return snapshots.save_snapshot(frames, run_id)
+
+# Function to build the stage graph of a full run
+def build_stages(output_path, write_db=True, run_id=None):
+    return {
+        'countries': (column_1.build_countries_frame, []),
+        'sanctions_map': (column_2.scrape_restrictive_measures, []),
+        'restrictive_measures': (lambda sanctions_map: sanctions_map.measures, ['sanctions_map']),
+        'executive_orders': (lambda: column_3.scrape_active_sanction_programs(column_3.OFAC_PROGRAMS_URL), []),
+        'type_of_sanctions': (scrape_type_of_sanctions, []),
+        'final': (consolidate_sources, ['countries', 'restrictive_measures', 'executive_orders', 'type_of_sanctions']),
+        'write': (lambda final: write_outputs(final, output_path, write_db), ['final']),
+        'snapshot': (lambda **frames: save_snapshot(run_id, **frames),
+                     ['sanctions_map', 'executive_orders', 'type_of_sanctions', 'final']),
+    }
+
+# Main execution function
+def main():
+    parser = argparse.ArgumentParser(description='Scrape every source concurrently and write the consolidated data.')
+    parser.add_argument('--output', default='final.xlsx', help='path of the consolidated workbook')
+    parser.add_argument('--no-db', action='store_true', help=f'skip writing the {TABLE_NAME} table')
+    parser.add_argument('--metrics-dir', default=metrics.METRICS_DIR,
+                        help='directory of the JSON run report and the Prometheus text file')
+    parser.add_argument('--resume', action='store_true', default=crawl_frontier.CRAWL_RESUME,
+                        help='reuse the pages completed by the last run and fetch only the missing or failed ones')
+    args = parser.parse_args()
+
+    # Every scraper records its progress in the shared crawl frontier
+    frontier = crawl_frontier.configure(resume=args.resume)
+
+    # The snapshot and the run report of a run share its id
+    run_id = snapshots.new_run_id()
+    started = time.perf_counter()
+    try:
+        with metrics.span('pipeline'):
+            run_graph(build_stages(args.output, write_db=not args.no_db, run_id=run_id))
+    finally:
+        # The browser-based scrapers share one pool of warm sessions for the whole run
+        driver_pool.close_default_pool()
+        # Lists the programs, countries and fact sheets that a resumed run would fetch
+        frontier.report_missing()
+        # Written for failed runs too, so they show where the time went
+        metrics.default_metrics().write_reports(args.metrics_dir, run_id)
+    log_message('info', f'Pipeline finished in {time.perf_counter() - started:.1f}s.')
+
+# Execute the main function
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Section found in a stream of pages. start and end are character offsets of the section text
+# in the pages joined with PAGE_SEPARATOR, first_page and last_page are 0-based page numbers.
+Section = namedtuple('Section', ['text', 'start', 'end', 'first_page', 'last_page'])
+
+# Separator placed between pages when they are scanned as one stream
+PAGE_SEPARATOR = '\n'
+
+# Function to build the pattern for a marker. Any run of whitespace matches the spaces between
+# its words, so markers wrapped onto a new line or across a page break are still found.
+def marker_pattern(keyword):
+    return r'\s+'.join(re.escape(word) for word in keyword.split())
+
+# Extracts the text between a start marker and the nearest of several end markers, which may be
+# wrapped or split across pages. The markers are compiled once and the pages are read as one stream,
+# each page only once; every end marker is then searched for separately, from the start of the section.
+class SectionExtractor:
+    def __init__(self, start_keyword, end_keywords):
+        self.start_pattern = re.compile(marker_pattern(start_keyword))
+        # One pattern per end marker, so k markers take k scans of the section. A pattern that starts
+        # with a literal is scanned for with a fast literal search; an alternation of the markers only
+        # gets a character-set prefix and measured about twice as slow (see bench_section_extractor.py).
+        self.end_patterns = [re.compile(marker_pattern(keyword)) for keyword in end_keywords]
+        # Text kept from earlier pages so a marker split by a page break can still match
+        self.start_overlap = 2 * len(start_keyword)
+        self.end_overlap = 2 * max((len(keyword) for keyword in end_keywords), default=0)
+
+    # Function to find the nearest end marker at or after pos
+    def search_end(self, text, pos=0):
+        nearest = None
+        for pattern in self.end_patterns:
+            match = pattern.search(text, pos)
+            if match and (nearest is None or match.start() < nearest.start()):
+                nearest = match
+        return nearest
+
+    # Function to find the (start, end) offsets of the section text, or None if the start marker is missing.
+    # Without an end marker the section runs to the end of the text.
+    def find(self, text):
+        start_match = self.start_pattern.search(text)
+        if start_match is None:
+            return None
+
+        end_match = self.search_end(text, start_match.end())
+        return start_match.end(), end_match.start() if end_match else len(text)
+
+    # Function to return the section text, or None if the start marker is missing
+    def extract(self, text):
+        offsets = self.find(text)
+        return text[offsets[0]:offsets[1]] if offsets else None
+
+    # Function to scan an iterable of page texts as one stream and return the first Section.
+    # Pages are consumed lazily and scanning stops at the end marker, so later pages are never read.
+    # Before the start marker only the tail of the stream is buffered.
+    def scan_pages(self, pages):
+        buffer = ''
+        buffer_offset = 0
+        section_start = None
+        first_page = None
+        page_number = -1
+
+        for page_number, page_text in enumerate(pages):
+            page_text = page_text or ''
+            if page_number:
+                page_text = PAGE_SEPARATOR + page_text
+            search_from = max(0, len(buffer) - (self.end_overlap if section_start is not None else self.start_overlap))
+            buffer += page_text
+
+            if section_start is None:
+                start_match = self.start_pattern.search(buffer, search_from)
+                if start_match is None:
+                    # Keep just enough text to match a start marker split across pages
+                    keep = min(self.start_overlap, len(buffer))
+                    buffer_offset += len(buffer) - keep
+                    buffer = buffer[len(buffer) - keep:]
+                    continue
+
+                section_start = buffer_offset + start_match.end()
+                first_page = page_number
+                buffer = buffer[start_match.end():]
+                buffer_offset = section_start
+                search_from = 0
+
+            end_match = self.search_end(buffer, search_from)
+            if end_match:
+                return Section(buffer[:end_match.start()], section_start, buffer_offset + end_match.start(),
+                               first_page, page_number)
+
+        if section_start is None:
+            return None
+        return Section(buffer, section_start, buffer_offset + len(buffer), first_page, page_number)
+
+# Function to get a compiled extractor, reused across documents with the same markers
+@lru_cache(maxsize=32)
+def get_extractor(start_keyword, end_keywords):
+    return SectionExtractor(start_keyword, tuple(end_keywords))
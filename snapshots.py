@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import logging
+import argparse
+import tempfile
+from datetime import datetime
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Directory holding one sub-directory of snapshots per run
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshots')
+
+# Column that identifies the country of an entry
+KEY_COLUMN = 'Country'
+
+# Separator used to join the columns of an entry into one comparable value
+ENTRY_SEPARATOR = '\x1f'
+
+# Prefixes that keep a missing value apart from an empty string once the columns are joined
+NULL_VALUE = '\x00'
+TEXT_PREFIX = '\x01'
+
+# Log function to standardize logging
+def log_message(level, message):
+    if level == 'info':
+        logging.info(message)
+    elif level == 'debug':
+        logging.debug(message)
+    elif level == 'error':
+        logging.error(message)
+    else:
+        logging.warning(message)
+
+# Function to build a run id that sorts in run order. Microseconds and a random suffix keep the ids
+# of runs started in the same second apart.
+def new_run_id():
+    return f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:6]}"
+
+# Function to convert a DataFrame to an Arrow table with every column stored as nullable text,
+# so snapshots of the same source always have the same schema
+def frame_to_table(df):
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        columns[str(name)] = pa.array(series.astype(str).where(series.notna(), None), type=pa.string(), from_pandas=True)
+    return pa.table(columns)
+
+# Function to save the frames of a run as uncompressed Arrow IPC files, which can be memory-mapped
+# when they are read back. The run directory is written under a temporary name and renamed at the end,
+# so a failed run never leaves a partial snapshot behind. An existing snapshot is never overwritten:
+# saving a run id that is already taken raises FileExistsError.
+def save_snapshot(frames, run_id=None, directory=SNAPSHOT_DIR):
+    run_id = run_id or new_run_id()
+    run_dir = os.path.join(directory, run_id)
+    if os.path.exists(run_dir):
+        raise FileExistsError(f'Snapshot {run_id} already exists in {directory}')
+    os.makedirs(directory, exist_ok=True)
+    partial_dir = tempfile.mkdtemp(prefix=f'{run_id}.', suffix='.partial', dir=directory)
+
+    manifest = {'run_id': run_id, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'frames': {}}
+    for name, df in frames.items():
+        table = frame_to_table(df)
+        with pa.OSFile(os.path.join(partial_dir, f'{name}.arrow'), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        manifest['frames'][name] = {'rows': table.num_rows, 'columns': table.column_names}
+
+    with open(os.path.join(partial_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    try:
+        # Fails when another process saved the same run id in the meantime
+        os.rename(partial_dir, run_dir)
+    except OSError:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        raise FileExistsError(f'Snapshot {run_id} already exists in {directory}')
+    log_message('info', f"Saved snapshot {run_id} of {', '.join(frames)} to {run_dir}.")
+    return run_id
+
+# Function to list the run ids with a complete snapshot, oldest first
+def list_runs(directory=SNAPSHOT_DIR):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory)
+                  if not name.endswith('.partial') and os.path.isfile(os.path.join(directory, name, 'manifest.json')))
+
+# Function to return the latest run id before the given one (or the latest of all), or None
+def latest_run(directory=SNAPSHOT_DIR, before=None):
+    runs = [run_id for run_id in list_runs(directory) if before is None or run_id < before]
+    return runs[-1] if runs else None
+
+# Function to read the manifest of a run
+def read_manifest(run_id, directory=SNAPSHOT_DIR):
+    with open(os.path.join(directory, run_id, 'manifest.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+# Function to open one frame of a run as an Arrow table backed by a memory map, so its
+# columns are read from the page cache instead of being copied into memory
+def open_snapshot(run_id, name, directory=SNAPSHOT_DIR):
+    source = pa.memory_map(os.path.join(directory, run_id, f'{name}.arrow'), 'r')
+    return pa.ipc.open_file(source).read_all()
+
+# Function to join the given columns of every row into one string per entry. Missing values
+# and empty strings are encoded differently, so they never compare equal.
+def entry_values(table, columns):
+    arrays = [pc.fill_null(pc.binary_join_element_wise(TEXT_PREFIX, table[column].combine_chunks(), ''), NULL_VALUE)
+              for column in columns]
+    return pc.binary_join_element_wise(*arrays, ENTRY_SEPARATOR)
+
+# Function to number the repeats of every entry (0 for its first row, 1 for its second, ...) and append
+# the number to the entry, so that comparing the numbered entries compares how often each row occurs
+def numbered_entries(entries):
+    count = len(entries)
+    order = pc.sort_indices(entries).to_numpy()
+    sorted_entries = entries.take(order)
+    starts = np.ones(count, dtype=bool)
+    if count > 1:
+        starts[1:] = pc.not_equal(sorted_entries.slice(1), sorted_entries.slice(0, count - 1)).to_numpy(zero_copy_only=False)
+    positions = np.arange(count)
+    occurrences = np.empty(count, dtype=np.int64)
+    occurrences[order] = positions - np.maximum.accumulate(np.where(starts, positions, 0))
+    return pc.binary_join_element_wise(entries, pc.cast(pa.array(occurrences), pa.string()), ENTRY_SEPARATOR)
+
+# Function to return the values of an array that are not in other, sorted
+def sorted_difference(values, other):
+    difference = values.filter(pc.invert(pc.is_in(values, value_set=other)))
+    return difference.take(pc.sort_indices(difference))
+
+# Function to diff two snapshots of a source with vectorized operations. Entries are whole rows compared
+# as multisets: a row that occurs three times in the old run and once in the new one is removed twice.
+# Countries that exist in both runs and gained or lost entries are reported as changed.
+def diff_tables(old, new, key=KEY_COLUMN):
+    columns = [column for column in new.column_names if column in old.column_names]
+    old_entries = numbered_entries(entry_values(old, columns))
+    new_entries = numbered_entries(entry_values(new, columns))
+
+    added = new.filter(pc.invert(pc.is_in(new_entries, value_set=old_entries)))
+    removed = old.filter(pc.invert(pc.is_in(old_entries, value_set=new_entries)))
+
+    old_countries = pc.unique(pc.drop_null(old[key]).combine_chunks())
+    new_countries = pc.unique(pc.drop_null(new[key]).combine_chunks())
+    touched = pc.unique(pc.drop_null(pa.chunked_array(added[key].chunks + removed[key].chunks, type=pa.string())
+                                     .combine_chunks()))
+    in_both = pc.and_(pc.is_in(touched, value_set=old_countries), pc.is_in(touched, value_set=new_countries))
+    changed = touched.filter(in_both)
+
+    return {
+        'added_countries': sorted_difference(new_countries, old_countries),
+        'removed_countries': sorted_difference(old_countries, new_countries),
+        'changed_countries': changed.take(pc.sort_indices(changed)),
+        'added_entries': added,
+        'removed_entries': removed,
+    }
+
+# Function to diff every frame the two runs have in common
+def diff_runs(old_run, new_run, names=None, directory=SNAPSHOT_DIR):
+    old_frames = read_manifest(old_run, directory)['frames']
+    new_frames = read_manifest(new_run, directory)['frames']
+    names = names or [name for name in new_frames if name in old_frames]
+    return {name: diff_tables(open_snapshot(old_run, name, directory), open_snapshot(new_run, name, directory))
+            for name in names}
+
+# Function to print a diff, showing at most limit entries of each kind
+def print_diff(name, diff, limit):
+    print(f"{name}: {len(diff['added_countries'])} countries added, {len(diff['removed_countries'])} removed, "
+          f"{len(diff['changed_countries'])} changed; {diff['added_entries'].num_rows} entries added, "
+          f"{diff['removed_entries'].num_rows} removed")
+    for label in ('added_countries', 'removed_countries', 'changed_countries'):
+        if len(diff[label]):
+            print(f"  {label.replace('_', ' ')}: {', '.join(diff[label].slice(0, limit).to_pylist())}"
+                  f"{' ...' if len(diff[label]) > limit else ''}")
+    for label, sign in (('added_entries', '+'), ('removed_entries', '-')):
+        # Only the rows that are printed are converted to Python objects
+        for row in diff[label].slice(0, limit).to_pylist():
+            text = ' | '.join(str(value).strip().replace('\n', ' ')[:100] for value in row.values())
+            print(f"  {sign} {text}")
+        if diff[label].num_rows > limit:
+            print(f"  {sign} ... {diff[label].num_rows - limit} more")
+
+# Main execution function
+def main():
+    parser = argparse.ArgumentParser(description='List run snapshots or show what changed between two runs.')
+    parser.add_argument('command', choices=['list', 'diff'])
+    parser.add_argument('old_run', nargs='?', help='earlier run id (default: the run before new_run)')
+    parser.add_argument('new_run', nargs='?', help='later run id (default: the latest run)')
+    parser.add_argument('--frame', action='append', help='frame to diff, e.g. final (default: all)')
+    parser.add_argument('--limit', type=int, default=20, help='entries shown per kind of change')
+    parser.add_argument('--directory', default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for run_id in list_runs(args.directory):
+            frames = read_manifest(run_id, args.directory)['frames']
+            print(f"{run_id}  " + '  '.join(f"{name}={info['rows']}" for name, info in frames.items()))
+        return
+
+    new_run = args.new_run or latest_run(args.directory)
+    old_run = args.old_run or latest_run(args.directory, before=new_run)
+    if not old_run or not new_run:
+        print('Two snapshots are needed for a diff.')
+        sys.exit(1)
+
+    print(f"Changes from {old_run} to {new_run}")
+    for name, diff in diff_runs(old_run, new_run, args.frame, args.directory).items():
+        print_diff(name, diff, args.limit)
+
+# Execute the main function
+if __name__ == "__main__":
+    main()
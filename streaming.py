@@ -0,0 +1,116 @@
+import os
+import time
+import queue
+import logging
+import threading
+from collections import namedtuple
+import metrics
+
+# Items a queue between two stages holds before the upstream stage has to wait
+STREAM_QUEUE_SIZE = int(os.getenv('STREAM_QUEUE_SIZE', 16))
+
+# One step of a streaming pipeline: func is called with each input item and returns an iterable of
+# output items (possibly empty), on `workers` threads at once
+Stage = namedtuple('Stage', ['name', 'func', 'workers'])
+
+# Marks the end of a queue's items
+_DONE = object()
+
+# Log function to standardize logging
+def log_message(level, message):
+    if level == 'info':
+        logging.info(message)
+    elif level == 'debug':
+        logging.debug(message)
+    elif level == 'error':
+        logging.error(message)
+    else:
+        logging.warning(message)
+
+# Function to put an item on a bounded queue, giving up once the pipeline is stopped
+def put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+# Function to feed the items of the source iterable into the first queue
+def feed(source, output, stop):
+    try:
+        for item in source:
+            if not put(output, item, stop):
+                return
+    except Exception as e:
+        log_message('error', f'Error in stage source: {e}')
+    finally:
+        put(output, _DONE, stop)
+
+# Function to run one worker of a stage. Errors on an item are logged and the item is skipped,
+# so one bad page does not stop the crawl. The last worker of a stage to finish closes its output.
+# Items produced, errors and the time spent per item are recorded per stage.
+def work(stage, input, output, stop, remaining, lock):
+    try:
+        while not stop.is_set():
+            try:
+                item = input.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                # Let the other workers of this stage see the end too
+                put(input, _DONE, stop)
+                return
+
+            started = time.perf_counter()
+            try:
+                for result in stage.func(item) or ():
+                    metrics.increment('stage_items', stage=stage.name)
+                    if not put(output, result, stop):
+                        return
+            except Exception as e:
+                metrics.increment('stage_errors', stage=stage.name)
+                log_message('error', f'Error in stage {stage.name}: {e}')
+            finally:
+                # Time spent on the item, including any wait for room in the next queue
+                metrics.observe('stage_item_seconds', time.perf_counter() - started, stage=stage.name)
+    finally:
+        with lock:
+            remaining[stage.name] -= 1
+            last = remaining[stage.name] == 0
+        if last:
+            put(output, _DONE, stop)
+
+# Function to run items from source through the stages, each stage on its own threads and connected to
+# the next by a queue of queue_size items, so a slow stage holds back the ones before it instead of
+# letting work pile up in memory. Yields the items of the last stage as they are produced;
+# closing the generator early stops every stage.
+def run_stages(source, stages, queue_size=STREAM_QUEUE_SIZE):
+    stop = threading.Event()
+    lock = threading.Lock()
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    remaining = {stage.name: max(1, stage.workers) for stage in stages}
+
+    threads = [threading.Thread(target=feed, args=(source, queues[0], stop), name='stage-source', daemon=True)]
+    for index, stage in enumerate(stages):
+        threads += [threading.Thread(target=work, args=(stage, queues[index], queues[index + 1], stop, remaining, lock),
+                                     name=f'stage-{stage.name}-{worker}', daemon=True)
+                    for worker in range(max(1, stage.workers))]
+
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            try:
+                item = queues[-1].get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
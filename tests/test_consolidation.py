@@ -0,0 +1,47 @@
+import os
+import sys
+import json
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from consolidation import COLUMNS, ENTRY_COLUMN, consolidate, consolidate_frames, prepare_restrictive_measures
+
+# Inputs and output of the notebook's consolidation cells, see its provenance field
+NOTEBOOK_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'notebook_consolidation.json')
+
+def load_fixture():
+    with open(NOTEBOOK_FIXTURE, encoding='utf-8') as f:
+        return json.load(f)
+
+def test_consolidate_matches_the_notebook_output():
+    fixture = load_fixture()
+    # One row per measure, as the scrapers return them
+    measures_df = pd.DataFrame([(country, measure, None, None, entry)
+                                for entry, country, measures in fixture['restrictive_measures'] for measure in measures],
+                               columns=COLUMNS + [ENTRY_COLUMN])
+    orders_df = pd.DataFrame(fixture['executive_orders'], columns=['Country', 'Executive Orders'])
+    sanctions_df = pd.DataFrame(fixture['type_of_sanctions'], columns=['Country', 'Type of Sanctions'])
+    countries_df = pd.DataFrame({'Country': fixture['countries']})
+
+    final = consolidate(measures_df, orders_df, sanctions_df, countries_df)
+    assert final.values.tolist() == fixture['final']
+
+def test_rows_of_a_country_are_separated_by_a_newline():
+    measures_df = pd.DataFrame({'Country': ['Russia', 'Russia', 'Iran', 'Russia'],
+                                'Restrictive Measures': ['Asset freeze', 'Travel ban', 'Arms embargo', 'Oil import ban'],
+                                ENTRY_COLUMN: ['Russia', 'Russia', 'Iran', 'Russia (2)']})
+    prepared = prepare_restrictive_measures(measures_df)
+    assert prepared[['Country', 'Restrictive Measures']].values.tolist() == [
+        ['Russia', '\n● Asset freeze\n● Travel ban\n\n● Oil import ban'], ['Iran', '\n● Arms embargo']]
+
+    # Without entries every measure of a country is one row
+    prepared = prepare_restrictive_measures(measures_df.drop(columns=ENTRY_COLUMN))
+    assert prepared['Restrictive Measures'].iloc[0] == '\n● Asset freeze\n● Travel ban\n● Oil import ban'
+
+def test_unknown_countries_are_dropped_and_values_keep_their_order():
+    countries_df = pd.DataFrame({'Country': ['Cuba', 'Iran']})
+    frames = [pd.DataFrame({'Country': ['Iran', 'Balkans', 'Iran'], 'Executive Orders': ['\n•EO 2', '\n•EO 9', '\n•EO 1']}),
+              pd.DataFrame({'Country': ['Cuba'], 'Type of Sanctions': ['Embargo']})]
+    final = consolidate_frames(frames, countries_df)
+    assert final.values.tolist() == [['Cuba', '', '', 'Embargo'], ['Iran', '', '\n•EO 2 \n•EO 1', '']]
@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from country_resolver import resolve, resolve_many, iso_code, canonical_names, unmatched_names
+
+def test_names_codes_and_programs_resolve_to_one_country():
+    assert resolve('Iran') == 'Iran'
+    assert resolve('IR') == 'Iran'
+    assert resolve('Russian Federation') == 'Russia'
+    assert resolve('Iran Sanctions') == 'Iran'
+    assert resolve('Burma-Related Sanctions') == 'Myanmar'
+    assert resolve("Democratic People's Republic of Korea (DPRK – North Korea)") == 'North Korea'
+    assert iso_code('Iran') == 'IR'
+
+def test_misspelt_names_resolve_by_fuzzy_match():
+    assert resolve('Venezuala') == 'Venezuela'
+
+def test_unknown_names_are_recorded():
+    assert resolve('Atlantis') is None
+    assert 'Atlantis' in unmatched_names()
+
+def test_names_listing_several_countries():
+    assert resolve_many('Ukraine-/Russia-Related Sanctions') == ['Ukraine', 'Russia']
+    assert resolve_many('Lemuria/Mu') == []
+    assert 'Lemuria/Mu' in unmatched_names() and 'Mu' not in unmatched_names()
+
+def test_canonical_names_are_sorted():
+    names = canonical_names()
+    assert names == sorted(names) and 'North Korea' in names
@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import threading
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_client
+from crawl_frontier import Frontier, DONE, FAILED
+
+def test_fetch_retries_with_backoff_and_stores_the_result(tmp_path):
+    frontier = Frontier(str(tmp_path / 'frontier.sqlite'), resume=False, retries=2, backoff=0.05)
+    calls = []
+
+    def flaky():
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            raise ValueError('503')
+        return ['row']
+
+    assert frontier.fetch('pages', 'a', flaky, label='A') == ['row']
+    assert len(calls) == 3
+    # The second backoff is twice the first
+    assert calls[1] - calls[0] >= 0.05 and calls[2] - calls[1] >= 0.1
+    item = frontier.get('pages', 'a')
+    assert item['state'] == DONE and item['attempts'] == 3 and item['result'] == ['row']
+
+def test_failed_items_are_reported_and_resumed(tmp_path):
+    path = str(tmp_path / 'frontier.sqlite')
+    frontier = Frontier(path, resume=False, retries=0)
+    frontier.add('pages', [('a', 'A'), ('b', 'B')])
+    frontier.fetch('pages', 'a', lambda: 1)
+    with pytest.raises(ValueError):
+        frontier.fetch('pages', 'b', lambda: (_ for _ in ()).throw(ValueError('timeout')))
+
+    missing = frontier.report_missing()
+    assert [(item['key'], item['state'], item['last_error']) for item in missing] == [('b', FAILED, 'timeout')]
+
+    # A resumed run reuses the completed item and only fetches the failed one
+    resumed = Frontier(path, resume=True, retries=0, backoff=0)
+    assert resumed.fetch('pages', 'a', lambda: pytest.fail('a was fetched again')) == 1
+    assert resumed.fetch('pages', 'b', lambda: 2) == 2
+    assert resumed.missing(['pages']) == []
+
+def test_backoff_releases_the_host_slot(tmp_path):
+    frontier = Frontier(str(tmp_path / 'frontier.sqlite'), resume=False, retries=1, backoff=0.5)
+    finished = {}
+    failed_once = threading.Event()
+
+    def fetch(key):
+        def read():
+            if key == 'slow' and not failed_once.is_set():
+                failed_once.set()
+                raise ValueError('503')
+            return key
+        result = frontier.fetch('pages', key, read)
+        finished[key] = time.monotonic()
+        return result
+
+    def url_of(key):
+        # Queue 'fast' for the host slot only once 'slow' has failed and is backing off
+        if key == 'fast':
+            failed_once.wait(5)
+        return 'http://example.org/' + key
+
+    started = time.monotonic()
+    results = http_client.run_concurrent(fetch, ['slow', 'fast'], url_of=url_of, max_workers=2, max_per_host=1)
+    assert results == ['slow', 'fast']
+    # With a single slot for the host, 'fast' still runs while 'slow' waits out its backoff
+    assert finished['fast'] - started < 0.4
+    assert finished['slow'] - started >= 0.5
+
+def test_frontier_sessions_do_not_retry(tmp_path):
+    session = http_client.create_session(pool_size=1, retries=0)
+    assert session.get_adapter('https://example.org').max_retries.total == 0
+    session = http_client.create_session(pool_size=1)
+    assert session.get_adapter('https://example.org').max_retries.total == 2
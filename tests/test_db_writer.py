@@ -0,0 +1,127 @@
+import os
+import sys
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text, Column, MetaData, String, Table, Text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_writer import bulk_load, upsert_frame, swap_column, sha1_row_keys
+
+# Function to read a table's data columns, sorted by country
+def read_table(engine, table_name, columns):
+    quoted = ', '.join(f'"{column}"' for column in columns)
+    with engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(text(f'SELECT {quoted} FROM {table_name} ORDER BY "Country"'))]
+
+def sqlite_engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'abl.db'}")
+
+def test_upsert_frame_writes_only_the_differences(tmp_path):
+    engine = sqlite_engine(tmp_path)
+    first = pd.DataFrame({'Country': ['Iran', 'Libya', 'Mali'],
+                          'Type of Sanctions': ['Asset freeze', 'Arms embargo', 'Travel ban']})
+    counts = upsert_frame(first, 'type_of_sanctions', ['Country'], engine=engine)
+    assert counts == {'inserted': 3, 'updated': 0, 'deleted': 0}
+
+    # Iran is unchanged, Libya changes, Mali is removed and Syria is added
+    second = pd.DataFrame({'Country': ['Iran', 'Libya', 'Syria'],
+                           'Type of Sanctions': ['Asset freeze', 'Arms embargo, asset freeze', 'Asset freeze']})
+    counts = upsert_frame(second, 'type_of_sanctions', ['Country'], engine=engine, delete_missing=True)
+    assert counts == {'inserted': 1, 'updated': 1, 'deleted': 1}
+    assert read_table(engine, 'type_of_sanctions', ['Country', 'Type of Sanctions']) == [
+        ('Iran', 'Asset freeze'), ('Libya', 'Arms embargo, asset freeze'), ('Syria', 'Asset freeze')]
+
+    # Loading the same frame again writes nothing
+    counts = upsert_frame(second, 'type_of_sanctions', ['Country'], engine=engine, delete_missing=True)
+    assert counts == {'inserted': 0, 'updated': 0, 'deleted': 0}
+
+def test_upsert_frame_keeps_repeated_keys_apart(tmp_path):
+    engine = sqlite_engine(tmp_path)
+    orders = pd.DataFrame({'Country': ['Iran', 'Iran', 'Cuba'],
+                           'Executive Orders': ['EO 13902', 'EO 13876', 'EO 12854']})
+    upsert_frame(orders, 'executive_orders', ['Country', 'Executive Orders'], engine=engine)
+
+    counts = upsert_frame(orders.iloc[1:], 'executive_orders', ['Country', 'Executive Orders'], engine=engine,
+                          delete_missing=True)
+    assert counts == {'inserted': 0, 'updated': 0, 'deleted': 1}
+    assert read_table(engine, 'executive_orders', ['Country', 'Executive Orders']) == [
+        ('Cuba', 'EO 12854'), ('Iran', 'EO 13876')]
+
+def test_upsert_frame_migrates_a_table_without_row_keys(tmp_path):
+    engine = sqlite_engine(tmp_path)
+    # A table as left behind by the old drop-and-replace loads
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE type_of_sanctions ("Country" TEXT)'))
+        conn.execute(text('INSERT INTO type_of_sanctions ("Country") VALUES (\'Iran\'), (\'Cuba\')'))
+
+    frame = pd.DataFrame({'Country': ['Iran', 'Libya'], 'Type of Sanctions': ['Asset freeze', 'Arms embargo']})
+    counts = upsert_frame(frame, 'type_of_sanctions', ['Country'], engine=engine, delete_missing=True)
+    assert counts == {'inserted': 2, 'updated': 0, 'deleted': 2}
+    assert read_table(engine, 'type_of_sanctions', ['Country', 'Type of Sanctions']) == [
+        ('Iran', 'Asset freeze'), ('Libya', 'Arms embargo')]
+
+def test_upsert_frame_keeps_rows_missing_from_a_partial_frame(tmp_path):
+    engine = sqlite_engine(tmp_path)
+    first = pd.DataFrame({'Country': ['Iran', 'Libya', 'Mali'],
+                          'Type of Sanctions': ['Asset freeze', 'Arms embargo', 'Travel ban']})
+    upsert_frame(first, 'type_of_sanctions', ['Country'], engine=engine, delete_missing=True)
+
+    # Only Iran was read this time; Libya and Mali stay as they were
+    partial = pd.DataFrame({'Country': ['Iran'], 'Type of Sanctions': ['Asset freeze, travel ban']})
+    counts = upsert_frame(partial, 'type_of_sanctions', ['Country'], engine=engine)
+    assert counts == {'inserted': 0, 'updated': 1, 'deleted': 0}
+    assert read_table(engine, 'type_of_sanctions', ['Country', 'Type of Sanctions']) == [
+        ('Iran', 'Asset freeze, travel ban'), ('Libya', 'Arms embargo'), ('Mali', 'Travel ban')]
+
+def test_upsert_frame_deletes_only_inside_the_scope(tmp_path):
+    engine = sqlite_engine(tmp_path)
+    measures = pd.DataFrame({'Country': ['Iran', 'Iran', 'Mali'],
+                             'Restrictive Measures': ['Asset freeze', 'Arms embargo', 'Travel ban']})
+    upsert_frame(measures, 'restrictive_measure', ['Country', 'Restrictive Measures'], engine=engine)
+
+    # Iran was read in full and lost a measure; Mali could not be read
+    iran = pd.DataFrame({'Country': ['Iran'], 'Restrictive Measures': ['Asset freeze']})
+    counts = upsert_frame(iran, 'restrictive_measure', ['Country', 'Restrictive Measures'], engine=engine,
+                          delete_missing=True, scope={'Country': ['Iran']})
+    assert counts == {'inserted': 0, 'updated': 0, 'deleted': 1}
+    assert read_table(engine, 'restrictive_measure', ['Country', 'Restrictive Measures']) == [
+        ('Iran', 'Asset freeze'), ('Mali', 'Travel ban')]
+
+def test_upsert_frame_replaces_rows_stored_under_sha1_keys(tmp_path):
+    engine = sqlite_engine(tmp_path)
+    frame = pd.DataFrame({'Country': ['Iran', 'Libya'], 'Type of Sanctions': ['Asset freeze', 'Arms embargo']})
+    # A table written by the first version of the writer, keyed by SHA-1 digests
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE type_of_sanctions (row_key VARCHAR(40) PRIMARY KEY, row_hash VARCHAR(40), '
+                          '"Country" TEXT, "Type of Sanctions" TEXT)'))
+        for row_key, (country, sanctions) in zip(sha1_row_keys(frame, ['Country']), frame.itertuples(index=False)):
+            conn.execute(text('INSERT INTO type_of_sanctions VALUES (:key, \'old\', :country, :sanctions)'),
+                         {'key': row_key, 'country': country, 'sanctions': sanctions})
+
+    counts = upsert_frame(frame, 'type_of_sanctions', ['Country'], engine=engine)
+    assert counts == {'inserted': 2, 'updated': 0, 'deleted': 2}
+    assert read_table(engine, 'type_of_sanctions', ['Country', 'Type of Sanctions']) == [
+        ('Iran', 'Asset freeze'), ('Libya', 'Arms embargo')]
+
+def test_bulk_load_adds_missing_columns(tmp_path):
+    engine = sqlite_engine(tmp_path)
+    bulk_load(pd.DataFrame({'Country': ['Iran']}), 'abl_data', engine=engine)
+
+    final = pd.DataFrame({'Country': ['Iran', 'Mali'], 'Restrictive Measures': ['Asset freeze', None]})
+    assert bulk_load(final, 'abl_data', engine=engine) == 2
+    assert read_table(engine, 'abl_data', ['Country', 'Restrictive Measures']) == [('Iran', 'Asset freeze'), ('Mali', None)]
+
+def test_swap_column_changes_the_type_and_keeps_the_values(tmp_path):
+    engine = sqlite_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE type_of_sanctions ("Country" VARCHAR(32), "Type of Sanctions" VARCHAR(32))'))
+        conn.execute(text('INSERT INTO type_of_sanctions VALUES (\'Iran\', \'Asset freeze\')'))
+
+    table = Table('type_of_sanctions', MetaData(), Column('Country', String(32)), Column('Type of Sanctions', Text()))
+    with engine.begin() as conn:
+        swap_column(conn, table, table.columns['Type of Sanctions'])
+
+    types = {column['name']: column['type'] for column in inspect(engine).get_columns('type_of_sanctions')}
+    assert set(types) == {'Country', 'Type of Sanctions'}
+    assert isinstance(types['Type of Sanctions'], Text)
+    assert read_table(engine, 'type_of_sanctions', ['Country', 'Type of Sanctions']) == [('Iran', 'Asset freeze')]
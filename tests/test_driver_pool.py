@@ -0,0 +1,107 @@
+import os
+import sys
+import threading
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from driver_pool import DriverPool
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures')
+
+# Stand-in for a WebDriver that reads local fixture pages, so the pool is tested without a browser
+class FakeDriver:
+    def __init__(self, started):
+        self.quit_count = 0
+        self.page_source = ''
+        started.append(self)
+
+    def get(self, url):
+        with open(url, encoding='utf-8') as f:
+            self.page_source = f.read()
+
+    def quit(self):
+        self.quit_count += 1
+
+# Function to build a pool of fake drivers and the list of the drivers it started
+def fake_pool(**options):
+    started = []
+    return DriverPool(driver_factory=lambda: FakeDriver(started), **options), started
+
+# Function to list the HTML fixture pages
+def fixture_pages():
+    return sorted(os.path.join(root, name) for root, _, files in os.walk(FIXTURES_DIR)
+                  for name in files if name.endswith('.html'))
+
+# Function to read the title of a page on a leased driver
+def read_title(driver, path):
+    driver.get(path)
+    source = driver.page_source
+    start = source.find('<title>')
+    return source[start + 7:source.find('</title>', start)].strip() if start != -1 else ''
+
+def test_leased_sessions_go_back_to_the_pool():
+    pool, started = fake_pool(size=2, max_pages=0)
+    with pool.lease() as first:
+        pass
+    with pool.lease() as second:
+        assert second is first
+    assert len(started) == 1
+
+    # Two leases held at once get separate sessions
+    with pool.lease() as one, pool.lease() as two:
+        assert one.driver is not two.driver
+    pool.close()
+    assert len(started) == 2
+    assert all(driver.quit_count == 1 for driver in started)
+
+def test_leases_block_while_every_session_is_leased():
+    pool, _ = fake_pool(size=1, max_pages=0)
+    leased = threading.Event()
+    with pool.lease():
+        thread = threading.Thread(target=lambda: pool.lease().__enter__() and leased.set())
+        thread.start()
+        thread.join(0.2)
+        assert not leased.is_set()
+    thread.join(5)
+    assert leased.is_set()
+
+def test_sessions_are_recycled_after_max_pages():
+    pool, started = fake_pool(size=1, max_pages=2)
+    pages = fixture_pages()[:5]
+    for page in pages:
+        with pool.lease() as driver:
+            driver.get(page)
+
+    # Pages 1-2 and 3-4 each used a session that was then quit; page 5 is on a third, still idle
+    assert len(started) == 3
+    assert [driver.quit_count for driver in started] == [1, 1, 0]
+    pool.close()
+    assert started[2].quit_count == 1
+
+def test_a_session_whose_work_fails_is_discarded():
+    pool, started = fake_pool(size=1, max_pages=0)
+    with pytest.raises(OSError):
+        with pool.lease() as driver:
+            driver.get(os.path.join(FIXTURES_DIR, 'missing.html'))
+    assert started[0].quit_count == 1
+
+    with pool.lease() as driver:
+        assert driver.driver is started[1]
+    pool.close()
+    with pytest.raises(RuntimeError):
+        with pool.lease():
+            pass
+
+def test_map_on_several_sessions_matches_one_session():
+    pages = fixture_pages()
+    serial_pool, _ = fake_pool(size=1, max_pages=0)
+    with serial_pool:
+        serial = serial_pool.map(read_title, pages)
+
+    pool, started = fake_pool(size=3, max_pages=4)
+    with pool.warm():
+        parallel = pool.map(read_title, pages)
+    assert parallel == serial
+    assert 'EU Sanctions Map' in parallel
+    assert all(driver.quit_count == 1 for driver in started)
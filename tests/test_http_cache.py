@@ -0,0 +1,68 @@
+import os
+import sys
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from http_cache import ResponseCache, CacheMiss, cache_mode
+from replay_server import start_server
+
+FACT_SHEETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'fixtures', 'www.securitycouncilreport.org', 'fact-sheets')
+
+@pytest.fixture
+def base_url():
+    server, url = start_server('www.securitycouncilreport.org')
+    yield url
+    server.shutdown()
+
+# Function to read a file's bytes
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def test_download_larger_than_the_cache_returns_its_body(tmp_path, base_url):
+    # Every fact sheet is larger than max_bytes, so each store would evict itself
+    cache = ResponseCache(directory=str(tmp_path / 'cache'), max_bytes=500)
+    with requests.Session() as session:
+        path, entry = cache.download(session, f'{base_url}/fact-sheets/dprk.pdf', mode='revalidate')
+
+    assert entry['from_cache'] is False
+    assert entry['size'] == os.path.getsize(os.path.join(FACT_SHEETS_DIR, 'dprk.pdf'))
+    assert read_bytes(path) == read_bytes(os.path.join(FACT_SHEETS_DIR, 'dprk.pdf'))
+    os.remove(path)
+
+def test_pinned_download_survives_eviction(tmp_path, base_url):
+    cache = ResponseCache(directory=str(tmp_path / 'cache'), max_bytes=3000)
+    with requests.Session() as session:
+        path, _ = cache.download(session, f'{base_url}/fact-sheets/dprk.pdf', mode='revalidate')
+        # Storing the next fact sheet evicts the first one from the object store
+        other_path, _ = cache.download(session, f'{base_url}/fact-sheets/libya.pdf', mode='revalidate')
+
+    assert cache.lookup(f'{base_url}/fact-sheets/dprk.pdf') is None
+    assert read_bytes(path) == read_bytes(os.path.join(FACT_SHEETS_DIR, 'dprk.pdf'))
+    os.remove(path)
+    os.remove(other_path)
+
+def test_offline_download_replays_and_misses(tmp_path, base_url):
+    cache = ResponseCache(directory=str(tmp_path / 'cache'))
+    with requests.Session() as session:
+        path, _ = cache.download(session, f'{base_url}/fact-sheets/mali.pdf', mode='revalidate')
+    os.remove(path)
+
+    path, entry = cache.download(None, f'{base_url}/fact-sheets/mali.pdf', mode='offline')
+    assert entry['from_cache'] is True
+    assert read_bytes(path) == read_bytes(os.path.join(FACT_SHEETS_DIR, 'mali.pdf'))
+    os.remove(path)
+
+    with pytest.raises(CacheMiss):
+        cache.download(None, f'{base_url}/fact-sheets/libya.pdf', mode='offline')
+
+def test_cache_mode_is_read_when_called(monkeypatch):
+    monkeypatch.setenv('HTTP_CACHE_MODE', 'offline')
+    assert cache_mode() == 'offline'
+    monkeypatch.setenv('HTTP_CACHE_MODE', 'off')
+    assert cache_mode() == 'off'
+    assert cache_mode('revalidate') == 'revalidate'
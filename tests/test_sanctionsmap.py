@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import snapshots
+import data_extraction_column_2 as column_2
+from html_parsing import parse
+from replay_server import start_server
+
+# Hand-made fixtures, see fixtures/manifest.json: these tests check the modes agree on the same data
+SANCTIONSMAP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures', 'www.sanctionsmap.eu')
+
+# Stand-in for a WebDriver on the sanctions map page. It answers the page scripts from the fixture HTML,
+# so the page mode is tested without a browser; popovers of the countries in `broken` return no text.
+class FakePageDriver:
+    def __init__(self, html, broken=()):
+        self.rows = []
+        for ul in parse(html).select('ul.filter-list'):
+            country = ul.select_one('li[data-heading="Country or Category"] div a')
+            measures = [div['data-popover'] for div in ul.select('li[data-heading="Restrictive measures"] li div')]
+            self.rows.append((country.get_text(strip=True), ul.get_text(), measures) if country else None)
+        self.broken = set(broken)
+        self.clicked = 0
+
+    def get(self, url):
+        pass
+
+    def find_elements(self, by, value):
+        return [row for row in self.rows if row]
+
+    def execute_script(self, script, *args):
+        if script == column_2.ROW_CONTENT_SCRIPT:
+            return [row[:2] if row else None for row in self.rows]
+        assert script == column_2.CLICK_POPOVERS_SCRIPT
+        only = args[0]
+        state = []
+        for index, row in enumerate(self.rows):
+            if row and (only is None or index in only):
+                country, _, measures = row
+                state.extend([index, country, None if country in self.broken else measure] for measure in measures)
+        self.clicked += len(state)
+        return state
+
+# Function to read the fixture page
+def read_page():
+    with open(os.path.join(SANCTIONSMAP_DIR, 'index.html'), encoding='utf-8') as f:
+        return f.read()
+
+# Function to read the fixture feed
+def read_feed():
+    with open(os.path.join(SANCTIONSMAP_DIR, 'api', 'v1', 'regime.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+# Function to save a crawl as a snapshot and load its rows back, as the next run would
+def previous_rows(crawl, directory):
+    snapshots.save_snapshot({column_2.SANCTIONSMAP_ROWS_FRAME: crawl.rows}, directory=directory)
+    return column_2.load_previous_rows(directory)
+
+@pytest.fixture
+def feed_url():
+    server, url = start_server('www.sanctionsmap.eu')
+    yield f'{url}/api/v1/regime'
+    server.shutdown()
+
+def test_feed_and_page_modes_read_the_same_measures(feed_url):
+    feed_df = column_2.scrape_data_from_feed(feed_url)
+    page = column_2.scrape_data_from_page(FakePageDriver(read_page()), 'fixture')
+
+    assert len(feed_df) == 25 and feed_df['Country'].nunique() == 9
+    assert column_2.compare_measures(feed_df, page.measures).empty
+    # Both modes key the measures by the same map rows
+    assert sorted(feed_df[column_2.ENTRY_COLUMN]) == sorted(page.measures[column_2.ENTRY_COLUMN])
+    assert page.failed == set()
+
+def test_feed_rows_of_the_same_country_are_numbered():
+    payload = {'data': [{'country': {'data': {'title': 'Russia'}}, 'measures': {'data': [{'description': 'Asset freeze'}]}},
+                        {'title': 'Iran', 'measures': [{'type': {'title': 'Arms embargo'}}]},
+                        {'country': 'Russia', 'measures': [{'description': ' Oil import ban '}]},
+                        {'measures': [{'description': 'No country'}]}]}
+    assert column_2.parse_feed(payload) == [('Russia', 'Russia', 'Asset freeze'), ('Iran', 'Iran', 'Arms embargo'),
+                                            ('Russia (2)', 'Russia', 'Oil import ban')]
+    assert len(column_2.parse_feed(read_feed())) == 25
+
+def test_unchanged_rows_are_reused_from_the_last_snapshot(tmp_path):
+    first = column_2.scrape_data_from_page(FakePageDriver(read_page()), 'fixture')
+    previous = previous_rows(first, str(tmp_path))
+
+    driver = FakePageDriver(read_page())
+    second = column_2.scrape_data_from_page(driver, 'fixture', previous)
+    assert driver.clicked == 0
+    assert column_2.compare_measures(first.measures, second.measures).empty
+
+def test_a_country_whose_popover_fails_keeps_its_last_measures(tmp_path):
+    first = column_2.scrape_data_from_page(FakePageDriver(read_page()), 'fixture')
+    previous = previous_rows(first, str(tmp_path))
+
+    # Belarus has a new measure, but its popovers return no text this time
+    html = read_page().replace('<li><div data-popover="Travel ban on listed persons.">Restrictions on admission</div></li>',
+                               '<li><div data-popover="Travel ban on listed persons.">Restrictions on admission</div></li>'
+                               '<li><div data-popover="Ban on imports of potash.">Import ban</div></li>', 1)
+    driver = FakePageDriver(html, broken={'Belarus'})
+    second = column_2.scrape_data_from_page(driver, 'fixture', previous)
+
+    assert driver.clicked == 5
+    assert second.failed == {'Belarus'}
+    assert column_2.compare_measures(first.measures, second.measures).empty
+    # The old fingerprint is kept, so the next run reads Belarus again
+    belarus = second.rows[second.rows['Country'] == 'Belarus']
+    assert set(belarus['Fingerprint']) == {previous['Belarus']['fingerprint']}
@@ -0,0 +1,45 @@
+import os
+import sys
+import pytest
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshots import new_run_id, save_snapshot, list_runs, diff_runs, frame_to_table, diff_tables
+
+def test_run_ids_are_unique_and_never_overwritten(tmp_path):
+    directory = str(tmp_path / 'snapshots')
+    frame = pd.DataFrame({'Country': ['Iran'], 'Restrictive Measures': ['Asset freeze']})
+
+    # Runs started within the same second get different ids
+    run_ids = [new_run_id() for _ in range(50)]
+    assert len(set(run_ids)) == 50
+
+    first = save_snapshot({'final': frame}, directory=directory)
+    second = save_snapshot({'final': frame}, directory=directory)
+    assert first != second
+    with pytest.raises(FileExistsError):
+        save_snapshot({'final': frame.iloc[0:0]}, run_id=first, directory=directory)
+    assert list_runs(directory) == sorted([first, second])
+    assert diff_runs(first, second, directory=directory)['final']['added_entries'].num_rows == 0
+
+def test_diff_counts_repeated_rows():
+    old = frame_to_table(pd.DataFrame({'Country': ['Iran', 'Iran', 'Iran', 'Cuba'],
+                                       'Executive Orders': ['EO 13599', 'EO 13599', 'EO 13599', 'EO 13224']}))
+    new = frame_to_table(pd.DataFrame({'Country': ['Iran', 'Cuba', 'Cuba'],
+                                       'Executive Orders': ['EO 13599', 'EO 13224', 'EO 13224']}))
+    diff = diff_tables(old, new)
+
+    assert diff['removed_entries'].to_pylist() == [{'Country': 'Iran', 'Executive Orders': 'EO 13599'}] * 2
+    assert diff['added_entries'].to_pylist() == [{'Country': 'Cuba', 'Executive Orders': 'EO 13224'}]
+    assert diff['changed_countries'].to_pylist() == ['Cuba', 'Iran']
+
+def test_diff_keeps_missing_values_apart_from_empty_strings():
+    old = frame_to_table(pd.DataFrame({'Country': ['Iran', 'Mali'], 'Executive Orders': [None, 'EO 13882']}))
+    new = frame_to_table(pd.DataFrame({'Country': ['Iran', 'Mali'], 'Executive Orders': ['', 'EO 13882']}))
+    diff = diff_tables(old, new)
+
+    assert diff['added_entries'].to_pylist() == [{'Country': 'Iran', 'Executive Orders': ''}]
+    assert diff['removed_entries'].to_pylist() == [{'Country': 'Iran', 'Executive Orders': None}]
+    assert diff['changed_countries'].to_pylist() == ['Iran']
+    assert len(diff['added_countries']) == 0 and len(diff['removed_countries']) == 0